@@ -1,10 +1,29 @@
+import itertools
 import math
 import time
-from services.board import Board
+from services.ai import AI
+from services.board import Board, WIDTH, HEIGHT
+from services.lazy_smp import LazySMP
+from services.tablebase import load_tablebase
+from services.time_manager import TimeManager
 
 VERY_LARGE_NUMBER = math.inf
 VERY_SMALL_NUMBER = -math.inf
 
+# Positions for comparing versions of the AI class, as the moves leading to them,
+# player 1 moving first. None of them has a forced move.
+BENCHMARK_POSITIONS = [
+    [1, 3, 5, 0, 0, 6, 4, 0, 2],
+    [0, 4, 1, 0, 0, 3, 3, 0, 1, 0, 4, 3, 0],
+    [2, 3, 1, 4, 0, 4],
+    [4, 6, 5, 1, 0, 4, 4, 5],
+    [2, 0, 4, 5, 0, 4, 0],
+    [5, 6, 1, 0, 4, 2],
+    [3, 2, 5, 3, 2, 4, 0, 0, 4, 3, 1, 6],
+    [1, 3, 3, 0, 5, 0, 6, 4, 4],
+    [2, 3, 5, 5, 0],
+    [5, 5, 2, 5]]
+
 
 class AICopy:
     """Class for performance testing the AI class, specifically different
@@ -458,6 +477,112 @@ class AICopy:
         return -score
 
 
+def compare_ai_settings(depth, settings, baseline=None):
+    """Compares the AI class with the given settings to the AI class with the baseline settings
+    on the benchmark positions, searching each to the given depth. Prints the positions
+    searched, i.e. nodes, and the time of both, and the moves chosen if they differ.
+
+    Args:
+        depth (int): The depth limit of the searches
+        settings (dict): Keyword arguments of the AI class to compare
+        baseline (dict): Keyword arguments of the AI class to compare to, by default none
+    """
+    totals = {"baseline": [0, 0], "compared": [0, 0]}
+    changed_moves = 0
+
+    for moves in BENCHMARK_POSITIONS:
+        board = Board()
+        for move_count, move in enumerate(moves):
+            board.make_move(move, move_count % 2 + 1)
+        ai_player = len(moves) % 2 + 1
+
+        chosen = {}
+        for name, kwargs in (("baseline", baseline or {}), ("compared", settings)):
+            # No time limit, so that both searches complete the depth
+            ai = AI(board, max_depth=depth, time_manager=TimeManager(move_time=math.inf),
+                    **kwargs)
+            start_time = time.time()
+            chosen[name] = ai.next_move(ai_player, len(moves))
+            totals[name][0] += ai.nodes
+            totals[name][1] += time.time() - start_time
+
+        if chosen["baseline"] != chosen["compared"]:
+            changed_moves += 1
+            print(f"Moves {moves}: move {chosen['baseline']} changed to {chosen['compared']}")
+
+    baseline_nodes, baseline_time = totals["baseline"]
+    nodes, total_time = totals["compared"]
+    print(f"Nodes {baseline_nodes} -> {nodes} "
+          f"({100 * (baseline_nodes - nodes) / baseline_nodes:.1f}% saved)")
+    print(f"Time {baseline_time:.2f} -> {total_time:.2f} seconds")
+    print(f"Moves changed in {changed_moves} of {len(BENCHMARK_POSITIONS)} positions")
+
+
+def compare_workers(depth, worker_counts):
+    """Compares the time the parallel search takes to complete the given depth on the benchmark
+    positions with different numbers of processes. Prints the total time and nodes of each
+    number of processes, and the speedup compared to the first.
+
+    Args:
+        depth (int): The depth the searches complete
+        worker_counts (list): The numbers of processes to compare
+    """
+    first_time = None
+    for workers in worker_counts:
+        board = Board()
+        smp = LazySMP(board, workers=workers, max_depth=depth,
+                      time_manager=TimeManager(move_time=math.inf))
+        total_time = 0
+        nodes = 0
+        for moves in BENCHMARK_POSITIONS:
+            smp.new_game()
+            board.clear_board()
+            for move_count, move in enumerate(moves):
+                board.make_move(move, move_count % 2 + 1)
+            start_time = time.time()
+            smp.next_move(len(moves) % 2 + 1, len(moves))
+            total_time += time.time() - start_time
+            nodes += smp.nodes
+        smp.close()
+
+        if first_time is None:
+            first_time = total_time
+        print(f"{workers} processes: {total_time:.2f} seconds, {nodes} nodes, "
+              f"speedup {first_time / total_time:.2f}")
+
+
+def compare_tablebase(depth, opening_moves, tablebase):
+    """Compares the AI's games against itself with and without the endgame tablebase,
+    from every opening of the given number of moves. Prints the time of both, and how many
+    of the tablebase lookups found their position.
+
+    Args:
+        depth (int): The depth limit of the searches
+        opening_moves (int): Number of moves of the openings
+        tablebase (Tablebase): The tablebase to compare to none
+    """
+    totals = {}
+    for name, games_tablebase in (("without", None), ("with", tablebase)):
+        start_time = time.time()
+        for opening in itertools.product(range(WIDTH), repeat=opening_moves):
+            board = Board()
+            ai = AI(board, max_depth=depth, tablebase=games_tablebase,
+                    time_manager=TimeManager(move_time=math.inf))
+            for move_count in range(WIDTH * HEIGHT):
+                if move_count < opening_moves:
+                    column = opening[move_count]
+                else:
+                    column = ai.next_move(move_count % 2 + 1, move_count)
+                board.make_move(column, move_count % 2 + 1)
+                if board.check_win(column):
+                    break
+        totals[name] = time.time() - start_time
+
+    print(f"Time {totals['without']:.2f} -> {totals['with']:.2f} seconds")
+    print(f"Tablebase hits {tablebase.hits} of {tablebase.probes} lookups "
+          f"({100 * tablebase.hits / max(1, tablebase.probes):.1f}%)")
+
+
 if __name__ == "__main__":
     test_board = Board()
 
@@ -516,3 +641,33 @@ if __name__ == "__main__":
     total_time = end_time - start_time
     print(total_time)
     print("")
+
+    print("Timing the AI class, principal variation search at the root")
+    start_time = time.time()
+    move = AI(test_board).next_move(ai_player, move_count, depth)
+    end_time = time.time()
+    total_time = end_time - start_time
+    print(total_time, "move", move)
+    print("")
+
+    print("Timing the AI class, MTD(f) at the root")
+    start_time = time.time()
+    move = AI(test_board).next_move_mtdf(ai_player, move_count, depth)
+    end_time = time.time()
+    total_time = end_time - start_time
+    print(total_time, "move", move)
+    print("")
+
+    print("Late move reductions compared to none")
+    compare_ai_settings(depth, {}, {"lmr_moves": None})
+    print("")
+
+    print("Time to depth of the parallel search by number of processes")
+    compare_workers(depth, [1, 2, 4, 8])
+    print("")
+
+    tablebase = load_tablebase()
+    if tablebase is not None:
+        print("Games of the AI against itself with the endgame tablebase compared to none")
+        compare_tablebase(6, 2, tablebase)
+        print("")
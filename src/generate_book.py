@@ -0,0 +1,22 @@
+import argparse
+import time
+from services.opening_book import BOOK_DEPTH, BOOK_PATH, BOOK_PLIES, generate_book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates the AI's opening book")
+    parser.add_argument("--plies", type=int, default=BOOK_PLIES,
+                        help="number of moves into the game the book covers")
+    parser.add_argument("--depth", type=int, default=BOOK_DEPTH,
+                        help="depth of the searches of the book moves")
+    parser.add_argument("--output", default=BOOK_PATH, help="path of the book file")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    count = generate_book(args.output, args.plies, args.depth)
+    print(f"{count} positions written to {args.output} "
+          f"in {time.perf_counter() - start_time:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
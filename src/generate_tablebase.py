@@ -0,0 +1,59 @@
+import argparse
+import itertools
+import math
+import time
+from services.ai import AI
+from services.board import Board, WIDTH, HEIGHT
+from services.tablebase import TABLEBASE_EMPTIES, TABLEBASE_PATH, generate_tablebase
+from services.time_manager import TimeManager
+
+
+def self_play_games(opening_moves, moves, depth):
+    """Plays the games the AI plays against itself from every opening, whose positions
+    after the given number of moves are the root positions of the tablebase.
+
+    Args:
+        opening_moves (int): Number of moves of the openings, all of which are played
+        moves (int): Number of moves in each game, games won before that are left out
+        depth (int): Depth of the AI's searches, so that the same games are played every time
+
+    Returns:
+        List of the boards of the games
+    """
+    games = []
+    for opening in itertools.product(range(WIDTH), repeat=opening_moves):
+        board = Board()
+        ai = AI(board, max_depth=depth, time_manager=TimeManager(move_time=math.inf))
+        for move_count in range(moves):
+            if move_count < opening_moves:
+                column = opening[move_count]
+            else:
+                column = ai.next_move(move_count % 2 + 1, move_count)
+            board.make_move(column, move_count % 2 + 1)
+            if board.check_win(column):
+                break
+        else:
+            games.append(board)
+    return games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates the AI's endgame tablebase")
+    parser.add_argument("--empties", type=int, default=TABLEBASE_EMPTIES,
+                        help="number of empty squares from which on positions are stored")
+    parser.add_argument("--openings", type=int, default=2,
+                        help="number of moves of the openings from which the AI plays itself")
+    parser.add_argument("--depth", type=int, default=6,
+                        help="depth of the searches of the AI's games")
+    parser.add_argument("--output", default=TABLEBASE_PATH, help="path of the tablebase file")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    roots = self_play_games(args.openings, WIDTH * HEIGHT - args.empties, args.depth)
+    count = generate_tablebase(roots, args.output, args.empties)
+    print(f"{count} positions written to {args.output} "
+          f"in {time.perf_counter() - start_time:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
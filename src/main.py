@@ -1,11 +1,12 @@
 from services.board import Board
 from services.ai import AI
+from services.opening_book import load_book
 from ui.game import Game
 
 
 def main():
     board = Board()
-    ai = AI(board)
+    ai = AI(board, opening_book=load_book())
     game = Game(board, ai)
 
     game.play_game()
@@ -1,170 +1,630 @@
 import math
-import time
-from services.board import Board
+from services.board import (Board, COLUMN_BITS, COLUMN_MASKS, HEIGHT, IDEAL_MOVE_ORDER, LINES,
+                            TURN_KEYS, WIDTH, square_column)
+from services.evaluation import WINDOW_SCORES
+from services.transposition import (EXACT, LOWER_BOUND, UPPER_BOUND, DEFAULT_SIZE_MB,
+                                    TranspositionTable)
+from services.time_manager import CHECK_INTERVAL, SearchTimeout, TimeManager
+from services.solver import Solver, result_distance
 
 VERY_LARGE_NUMBER = math.inf
 VERY_SMALL_NUMBER = -math.inf
 
+WIN_SCORE = 1000000
+# Scores beyond this are wins or losses, heuristic scores always stay below it
+WIN_THRESHOLD = WIN_SCORE // 2
+
+# Half width of the aspiration window of iterative deepening, see next_move.
+# Two lines of two pieces; widths from 10 to 40 visited the fewest nodes in benchmarks
+ASPIRATION_WINDOW = 20
+
+# Default settings of late move reductions, see negamax: moves after the first LMR_MOVES
+# at a node with at least LMR_DEPTH depth left are searched LMR_REDUCTION shallower first
+LMR_MOVES = 3
+LMR_DEPTH = 3
+LMR_REDUCTION = 1
+
+# Positions with at most this many empty squares are solved exactly, see next_move.
+# The solver took at most a tenth of a second for random positions with 20 empty squares
+SOLVER_THRESHOLD = 20
+# Share of the move's time the solver may take before the heuristic search is used instead
+SOLVER_TIME_SHARE = 0.5
+
 
 class AI:
-    def __init__(self, board: Board):
+    def __init__(self, board: Board, table_size_mb=DEFAULT_SIZE_MB,
+                 aspiration_window=ASPIRATION_WINDOW, time_manager=None, max_depth=None,
+                 lmr_moves=LMR_MOVES, lmr_depth=LMR_DEPTH, lmr_reduction=LMR_REDUCTION,
+                 solver_threshold=SOLVER_THRESHOLD, opening_book=None, tablebase=None,
+                 transposition_table=None, start_depth=1):
         """Class constructor
 
         Args:
             board (Board): The game board
+            table_size_mb (float): Memory for the transposition table in megabytes
+            aspiration_window (int): Half width of the aspiration window of iterative deepening,
+                                     0 to always search with a full window
+            time_manager (TimeManager): Decides the time of each move,
+                                        by default MOVE_TIME seconds per move without a game clock
+            max_depth (int): The deepest search of iterative deepening, None to search
+                             as deep as the time allows
+            lmr_moves (int): Number of moves at a node searched without late move reductions,
+                             None to turn the reductions off
+            lmr_depth (int): The least remaining depth at which late moves are reduced
+            lmr_reduction (int): Number of plies by which the first search of a late move
+                                 is shallower
+            solver_threshold (int): Number of empty squares from which on positions are solved
+                                    exactly, None to always use the heuristic search
+            opening_book (OpeningBook): Moves to make without searching in the opening,
+                                        None to search every move
+            tablebase (Tablebase): Solved endgame positions, whose subtrees are not searched,
+                                   None to search every position
+            transposition_table (TranspositionTable): The table to use, e.g. one shared with
+                                                      other processes, by default a new table
+                                                      of table_size_mb
+            start_depth (int): The first depth of iterative deepening, helper processes
+                               of the parallel search start deeper, see services/lazy_smp.py
         """
         self.board = board
-
-    def next_move(self, ai_player, move_count):
+        self.aspiration_window = aspiration_window
+        self.time_manager = time_manager if time_manager is not None else TimeManager()
+        self.max_depth = max_depth
+        self.lmr_moves = lmr_moves
+        self.lmr_depth = lmr_depth
+        self.lmr_reduction = lmr_reduction
+        self.solver_threshold = solver_threshold
+        self.opening_book = opening_book
+        self.tablebase = tablebase
+        self.solver = Solver(tablebase=tablebase)
+        # Number of positions searched, the search checks the time every CHECK_INTERVAL of them
+        self.nodes = 0
+        self.start_depth = start_depth
+        # The deepest completed depth of iterative deepening for the last move, or the depth
+        # until the end of the game if the move was made without the heuristic search
+        self.completed_depth = 0
+        self._root_history_length = 0
+        # The transposition table is kept between moves, since the search for the next move
+        # goes through mostly the same positions as the previous one
+        self.table = (transposition_table if transposition_table is not None
+                      else TranspositionTable(table_size_mb))
+        # Move ordering heuristics: two killer moves per ply, i.e. per number of moves made,
+        # and history scores per player and square, see _order_moves
+        self.killers = [[None, None] for ply in range(WIDTH * HEIGHT + 1)]
+        self.history_scores = [[], [0] * (WIDTH * COLUMN_BITS), [0] * (WIDTH * COLUMN_BITS)]
+
+    def new_game(self):
+        """Empties the transposition table and the move ordering heuristics,
+        and resets the game clock before a new game.
+        """
+        self.time_manager.new_game()
+        self.table.clear()
+        self.solver.clear()
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for player in (1, 2):
+            self.history_scores[player] = [0] * (WIDTH * COLUMN_BITS)
+
+    def next_move(self, ai_player, move_count, max_depth=None):
         """Finds the next move to make, aiming to find the best possible one.
 
         Args:
             ai_player (int): Which player (1 or 2) the AI is playing
             move_count (int): Moves in the game so far
+            max_depth (int): The deepest search of iterative deepening,
+                             by default the AI's max_depth
 
         Returns:
             best_move (int): The column into which the AI makes its next move.
         """
+        return self._find_move(ai_player, move_count, max_depth, self._pvs_depths)
 
-        max_score = VERY_SMALL_NUMBER  # alpha
-        min_score = VERY_LARGE_NUMBER  # beta
+    def next_move_mtdf(self, ai_player, move_count, max_depth=None):
+        """Finds the next move like next_move, but searches each depth of iterative deepening
+        with MTD(f) instead of a principal variation search at the root.
 
-        best_move = 3
-        max_depth = 6
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+            max_depth (int): The deepest search of iterative deepening,
+                             by default the AI's max_depth
 
-        move_time = 3
+        Returns:
+            best_move (int): The column into which the AI makes its next move.
+        """
+        return self._find_move(ai_player, move_count, max_depth, self._mtdf_depths)
 
-        cache = {}
+    def _find_move(self, ai_player, move_count, max_depth, search_depths):
+        """Finds the next move, shared by next_move and next_move_mtdf: times the move,
+        makes forced, book and solved moves without searching, and otherwise runs
+        iterative deepening with the given search of the depths.
 
-        # Iterative deepening
-        start_time = time.time()
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+            max_depth (int): The deepest search of iterative deepening,
+                             None for the AI's max_depth
+            search_depths (function): Searches the given depths one after the other,
+                                      generating each completed depth and its best move
 
-        for depth in range(1, max_depth + 1):
+        Returns:
+            best_move (int): The column into which the AI makes its next move.
+        """
+        self.time_manager.start_move(move_count)
+        self.completed_depth = WIDTH * HEIGHT - move_count
+        best_move = self._forced_move(ai_player, move_count)
+        if best_move is None:
+            best_move = self._book_move(move_count)
+        if best_move is None:
+            self._start_search()
+            best_move = self._solve_endgame(ai_player, move_count)
+        if best_move is not None:
+            self.time_manager.end_move()
+            return best_move
+
+        # If every move loses, they are all searched to still choose one
+        best_move = (self.generate_moves(ai_player, move_count)
+                     or self._order_moves(ai_player, move_count))[0]
+        self.completed_depth = 0
+
+        # Iterative deepening, until the time runs out. If it runs out in the middle of a depth,
+        # the best move of the last completed depth is made.
+        try:
+            depth_limit = self._depth_limit(move_count, max_depth)
+            depths = range(min(self.start_depth, depth_limit), depth_limit + 1)
+            for depth, best_move in search_depths(ai_player, move_count, depths):
+                self.completed_depth = depth
+                # At least one depth is searched, also when the solver used up its share of
+                # the time, after which a new depth would otherwise not be started
+                if not self.time_manager.can_start_depth():
+                    break
+        except SearchTimeout:
+            self._stop_search()
 
-            max_score = VERY_SMALL_NUMBER  # alpha
-            min_score = VERY_LARGE_NUMBER  # beta
+        self.time_manager.end_move()
+        return best_move
 
-            moves = self.get_possible_moves()
-            if best_move in moves:
-                moves.remove(best_move)
-                moves.insert(0, best_move)
+    def _pvs_depths(self, ai_player, move_count, depths):
+        """Searches the depths of iterative deepening with a principal variation search
+        at the root, see _find_move.
 
-            for move in moves:
-                # Time Limit exceeded, return best_move immediately
-                # Checking for the time limit after each move is better than at every depth
-                if time.time() - start_time >= move_time:
-                    print("Time Exceeded")
-                    return best_move
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+            depths (range): The depths to search
 
-                self.board.make_move(move, ai_player)
-                move_count += 1
+        Yields:
+            depth, best_move: Each completed depth and its best move
+        """
+        best_move = None
+        # Scores of the completed depths, by depth
+        scores = {}
+        for depth in depths:
+            moves = (self.generate_moves(ai_player, move_count, best_move)
+                     or self._order_moves(ai_player, move_count, best_move))
+
+            # Aspiration window: the score rarely changes much from two depths before,
+            # so a narrow window around it cuts off more. The previous depth is not used,
+            # since the evaluation favours the player who made the last move of the search.
+            # If the score falls outside, the window is widened on that side and
+            # the depth is searched again.
+            delta = self.aspiration_window
+            if delta and depth - 2 in scores and abs(scores[depth - 2]) < WIN_THRESHOLD:
+                alpha, beta = scores[depth - 2] - delta, scores[depth - 2] + delta
+            else:
+                alpha, beta = VERY_SMALL_NUMBER, VERY_LARGE_NUMBER
+
+            while True:
+                value, move, losing_count = self._search_root(
+                    depth, ai_player, move_count, moves, alpha, beta)
+
+                delta *= 4
+                if value <= alpha:
+                    alpha = value - delta if abs(value) < WIN_THRESHOLD else VERY_SMALL_NUMBER
+                elif value >= beta:
+                    beta = value + delta if abs(value) < WIN_THRESHOLD else VERY_LARGE_NUMBER
+                    # Search the move that failed high first
+                    moves.remove(move)
+                    moves.insert(0, move)
+                else:
+                    break
 
-                # Change turn, since AI player just made a move
-                turn = 2 if ai_player == 1 else 1
+            scores[depth] = value
+            best_move = move
+            yield depth, best_move
 
-                minimax = self.minimax(
-                    depth, turn, max_score, min_score, move, move_count, ai_player, cache)
-                score = minimax[0]
+            # Searching deeper changes nothing once the result of the game is proven,
+            # or when all the other moves are proven to lose
+            if abs(value) > WIN_THRESHOLD or losing_count == len(moves) - 1:
+                break
 
-                if score > max_score:
-                    max_score = score
-                    best_move = move
+    def _mtdf_depths(self, ai_player, move_count, depths):
+        """Searches the depths of iterative deepening with MTD(f), see _find_move.
 
-                self.board.undo_move(move)
-                move_count -= 1
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+            depths (range): The depths to search
 
-        return best_move
+        Yields:
+            depth, best_move: Each completed depth and its best move
+        """
+        # Values of the completed depths, by depth
+        values = {}
+        for depth in depths:
+            # The first guess is the value from two depths before, as for the aspiration windows
+            first_guess = values.get(depth - 2, 0)
+            # The root is a position to search as well, so it adds one to the depth
+            value, best_move = self.mtdf(depth + 1, ai_player, move_count, first_guess)
+            values[depth] = value
+            yield depth, best_move
+
+            # Searching deeper changes nothing once the result of the game is proven
+            if abs(value) > WIN_THRESHOLD:
+                break
+
+    def mtdf(self, depth, turn, move_count, first_guess):
+        """MTD(f): finds the value of the current position by a sequence of null window searches,
+        each of which tells whether the value is above or below a guess. The guesses move towards
+        the value, and the bounds found by the searches are kept in the transposition table,
+        so that the later searches repeat little of the work.
+
+        Args:
+            depth (int): The depth to which the position is searched, see negamax
+            turn (int): The player whose turn it is
+            move_count (int): The number of moves made in the game so far
+            first_guess (int): Guess of the value, the closer the fewer searches are needed
+
+        Returns:
+            value, best_move: The value of the position for the player to move, and the best move
+        """
+        value = first_guess
+        lower, upper = VERY_SMALL_NUMBER, VERY_LARGE_NUMBER
+        best_move = None
+
+        while lower < upper:
+            beta = value + 1 if value == lower else value
+            value, move = self.negamax(
+                depth, turn, beta - 1, beta, self.board.last_move, move_count, self.table)
+            if value < beta:
+                upper = value
+            else:
+                lower = value
+                best_move = move
+            # A search below the value gives no move that reaches it
+            if best_move is None:
+                best_move = move
+
+        return value, best_move
+
+    def solve(self, ai_player, move_count):
+        """Solves the current position exactly, by searching until the end of the game.
+
+        Args:
+            ai_player (int): The player whose turn it is
+            move_count (int): Moves in the game so far
+
+        Returns:
+            best_move, score, distance: The best move, the score of the position
+                                        for the player (positive for a win, negative
+                                        for a loss, 0 for a draw, see Solver),
+                                        and the number of moves until the game ends
+
+        Raises:
+            SearchTimeout: If the solver's share of the move's time has run out
+        """
+        score, best_move = self.solver.solve(
+            self.board, ai_player, time_up=lambda: self.time_manager.time_up(SOLVER_TIME_SHARE))
+        return best_move, score, result_distance(score, move_count)
+
+    def _solve_endgame(self, ai_player, move_count):
+        """Solves the position exactly if few enough squares are empty.
+
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+
+        Returns:
+            The best move, or None if the position is not solved, also when the solver
+            ran out of time
+        """
+        if self.solver_threshold is None or WIDTH * HEIGHT - move_count > self.solver_threshold:
+            return None
+        try:
+            return self.solve(ai_player, move_count)[0]
+        except SearchTimeout:
+            return None
+
+    def _forced_move(self, ai_player, move_count):
+        """Finds the move to make without searching, if there is no choice to make:
+        the only legal move, a move that wins right away, the move blocking the
+        opponent's threat, or the only move not letting the opponent win right away.
+
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+
+        Returns:
+            The column of the move, or None if the moves need to be searched
+        """
+        moves = self.generate_moves(ai_player, move_count)
+        if len(moves) == 1:
+            return moves[0]
+        moves = self.get_possible_moves()
+        if len(moves) == 1:
+            return moves[0]
+        return None
+
+    def _book_move(self, move_count):
+        """Looks up the move to make in the opening book.
+
+        Args:
+            move_count (int): Moves in the game so far
+
+        Returns:
+            The column of the book move, or None if the position is not in the book
+        """
+        if self.opening_book is None or move_count >= self.opening_book.plies:
+            return None
+        move = self.opening_book.lookup(self.board)
+        if move is None or not self.board.check_valid_move(move):
+            return None
+        return move
+
+    def _depth_limit(self, move_count, max_depth):
+        """Gives the deepest search of iterative deepening for a move.
+
+        Args:
+            move_count (int): Moves in the game so far
+            max_depth (int): Depth limit asked for, None for the AI's max_depth
+
+        Returns:
+            The depth limit, never beyond the end of the game
+        """
+        if max_depth is None:
+            max_depth = self.max_depth
+        # The root move is not counted in the depth
+        moves_left = WIDTH * HEIGHT - move_count - 1
+        if max_depth is None or max_depth > moves_left:
+            return max(1, moves_left)
+        return max_depth
+
+    def _start_search(self):
+        """Prepares the transposition table and move ordering heuristics for a new search.
+        """
+        self.table.new_search()
+        # Halve the history scores, so that the ones from this search weigh more
+        for player in (1, 2):
+            self.history_scores[player] = [score // 2 for score in self.history_scores[player]]
+        self._root_history_length = len(self.board.history)
+
+    def _stop_search(self):
+        """Cleans up after the time ran out in the middle of a search, by undoing the moves
+        the search had made on the board.
+        """
+        print("Time Exceeded")
+        while len(self.board.history) > self._root_history_length:
+            self.board.undo_move()
+
+    def _search_root(self, depth, ai_player, move_count, moves, alpha, beta):
+        """Searches the moves of the AI player at the root of the search, with
+        principal variation search as in negamax.
+
+        Args:
+            depth (int): The depth to which the positions after the moves are searched
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+            moves (list): The moves to search, in order
+            alpha, beta (float): The search window
+
+        Returns:
+            value, best_move, losing_count: The value of the best move and the move, or the highest
+                              upper bound and None, if no move is better than alpha, and the number
+                              of moves proven to lose
+        """
+        cache = self.table
+        # Change turn, since AI player makes a move before the search continues
+        turn = 3 - ai_player
+        value_found = VERY_SMALL_NUMBER
+        best_move = None
+        losing_count = 0
+
+        for index, move in enumerate(moves):
+            self.board.make_move(move, ai_player)
+
+            # Principal variation search, see negamax
+            if index == 0:
+                score = -self.negamax(
+                    depth, turn, -beta, -alpha, move, move_count + 1, cache)[0]
+            else:
+                score = -self.negamax(
+                    depth, turn, -alpha - 1, -alpha, move, move_count + 1, cache)[0]
+                if alpha < score < beta:
+                    score = -self.negamax(
+                        depth, turn, -beta, -alpha, move, move_count + 1, cache)[0]
+
+            self.board.undo_move(move)
+
+            # Loss scores are exact values or upper bounds, so the move is proven to lose
+            if score < -WIN_THRESHOLD:
+                losing_count += 1
+
+            value_found = max(value_found, score)
+            if score > alpha:
+                alpha = score
+                best_move = move
+                if alpha >= beta:
+                    break
+
+        return value_found, best_move, losing_count
 
     def minimax(self, depth: int, turn: int, alpha, beta, prev_move, move_count, ai_player, cache):
-        """Recursive minimax algorithm function, with alpha beta pruning.
+        """Minimax value of the position for the AI player, with alpha beta pruning.
+        Searches with negamax, turning values and bounds to and from the view
+        of the player whose turn it is.
 
         Args:
             depth (int): The depth to which the minimax algorithm searches game states
             turn (int): 1 or 2, depending on whose turn it is.
                         If ai_play == turn, it is the maximising (AI) player's turn
-            alpha, beta (float): Alpha -beta pruning values
-            prev_move (int): The previous move made
+            alpha, beta (float): Alpha -beta pruning values, for the AI player
+            prev_move (int): The previous move made, the only one that can have led to a win
             move_count (int): The number of moves made in the game so far
             ai_player (int): Whether the AI is playing player 1 or 2 in this game
-            cache (dict): Cache for storing board states and the associated best move per player
+            cache (TranspositionTable): Transposition table, see negamax
 
         Returns:
             value, best_move : The best move (int representing a column)
                                 and game state value belonging to that move
         """
+        if turn == ai_player:
+            return self.negamax(depth, turn, alpha, beta, prev_move, move_count, cache)
+        value, best_move = self.negamax(depth, turn, -beta, -alpha, prev_move, move_count, cache)
+        return -value, best_move
 
-        # Create cache key for the current board state
-        state = tuple(map(tuple, self.board.board))
-        cache_key = (state, turn)
-
-        # Check whether the previous player's turn led to a win and score accordingly
-        if self.board.check_four_connected():
-            if turn != ai_player:
-                return 1000000 + depth, prev_move
-            return -1000000 - depth, prev_move
-
-        # Check whether there is a draw
-        if move_count == 42:
-            return 0, prev_move
-
-        # Check if depth has reached 0, if yes, return board state evaluation for the current player
-        if depth == 0:
-            score = self.evaluate_board(ai_player, turn)
-            return score, prev_move
+    def negamax(self, depth: int, turn: int, alpha, beta, prev_move, move_count, cache):
+        """Recursive negamax algorithm function, with alpha beta pruning,
+        principal variation search and late move reductions.
 
-        # If current board state in cache, put best move to the front of moves list
-        moves = self.get_possible_moves()
-        if cache_key in cache:
-            moves.remove(cache[cache_key][1])
-            moves.insert(0, cache[cache_key][1])
+        Values are always for the player whose turn it is, so the value of a move
+        is the negated value of the position after it for the opponent.
+        The first, presumably best, move is searched with the full alpha-beta window.
+        The others are searched with a null window just above alpha, which only proves
+        whether the move is worse than the first one, and cuts off much more.
+        Only if a move turns out better is it searched again with the full window.
 
-        # Maximising player turn
-        if turn == ai_player:
-            max_value = VERY_SMALL_NUMBER
-            for move in moves:
-                self.board.make_move(move, turn)
-                move_count += 1
+        Args:
+            depth (int): The depth to which the algorithm searches game states
+            turn (int): 1 or 2, depending on whose turn it is
+            alpha, beta (float): Alpha -beta pruning values
+            prev_move (int): The previous move made, the only one that can have led to a win
+            move_count (int): The number of moves made in the game so far
+            cache (TranspositionTable): Transposition table storing an entry per board state
+                            and player to move, keyed by the canonical Zobrist hash of the
+                            board combined with the turn. Mirrored positions share an entry.
 
-                value, _ = self.minimax(
-                    depth-1, 3-turn, alpha, beta, move, move_count, ai_player, cache)
-                # Since turn is either 1 or 2, 3 - turn gives the other player number
+        Returns:
+            value, best_move : The best move (int representing a column)
+                                and game state value belonging to that move
 
-                self.board.undo_move(move)
-                move_count -= 1
+        Raises:
+            SearchTimeout: If the time manager's deadline has passed
+        """
+        # Check the time every CHECK_INTERVAL positions
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and self.time_manager.time_up():
+            raise SearchTimeout
 
-                if value > max_value:
-                    max_value = value
-                    best_move = move
-                    cache[cache_key] = max_value, best_move
+        # Check whether the previous player's turn led to a win, so the current player lost
+        if self.board.check_win(prev_move):
+            return -WIN_SCORE - depth, prev_move
 
-                if value >= beta:
-                    break
-                alpha = max(alpha, value)
+        # Check whether there is a draw
+        if move_count == 42:
+            return 0, prev_move
 
-            return max_value, best_move
+        # Positions in the tablebase are solved, so their subtree is not searched. The root is
+        # always searched, since the tablebase gives no move.
+        if (self.tablebase is not None and WIDTH * HEIGHT - move_count <= self.tablebase.empties
+                and len(self.board.history) > self._root_history_length):
+            pieces = self.board.position if turn == 1 else self.board.mask ^ self.board.position
+            solved = self.tablebase.probe(pieces, self.board.mask)
+            if solved is not None:
+                result, distance = solved
+                # The same values as searching to the end, see the wins and losses above and below
+                return result * (WIN_SCORE + depth - distance), prev_move
 
-        # Minimizing player turn
-        min_value = VERY_LARGE_NUMBER
-        for move in moves:
+        # Check if depth has reached 0, if yes, return board state evaluation for the current player
+        if depth == 0:
+            return self.evaluate_board(turn, turn), prev_move
+
+        # A move that wins right away is the best move, the opponent gets no turn
+        winning_squares = self.board.winning_squares(turn) & self.board.possible_squares()
+        if winning_squares:
+            return WIN_SCORE + depth - 1, square_column(winning_squares)
+
+        # If current board state in cache, use the stored value if it was searched deep enough,
+        # and put the stored best move to the front of moves list
+        # Mirrored positions share the entry of the one with the smaller key,
+        # with the best move stored for that one
+        key, mirror_key = self.board.key, self.board.mirror_key
+        mirrored = mirror_key < key
+        cache_key = (mirror_key if mirrored else key) ^ TURN_KEYS[turn]
+        alpha_orig = alpha
+        entry = cache.get(cache_key)
+        cached_move = None
+        if entry is not None:
+            cached_move = WIDTH - 1 - entry.best_move if mirrored else entry.best_move
+            if entry.depth >= depth:
+                value = _from_table_value(entry.value, depth)
+                if entry.bound == EXACT:
+                    return value, cached_move
+                if entry.bound == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, cached_move
+        moves = self._non_losing_moves(turn, move_count, cached_move)
+        if not moves:
+            # Whatever the move, the opponent wins with the next one
+            return -WIN_SCORE - depth + 2, self.get_possible_moves()[0]
+
+        # Late move reductions: moves late in the order rarely turn out best, so they are
+        # first searched shallower with a null window, and only searched to the full depth
+        # if they beat alpha. Killer moves and moves making a new threat are not reduced.
+        reduce_late_moves = self.lmr_moves is not None and depth >= self.lmr_depth
+        killers = ()
+        threat_squares = 0
+        if reduce_late_moves:
+            killers = self.killers[move_count]
+            threat_squares = self.board.winning_squares(turn)
+
+        value_found = VERY_SMALL_NUMBER
+        best_move = moves[0]
+        for index, move in enumerate(moves):
             self.board.make_move(move, turn)
-            move_count += 1
 
-            value, _ = self.minimax(
-                depth-1, 3-turn, alpha, beta, move, move_count, ai_player, cache)
+            # Since turn is either 1 or 2, 3 - turn gives the other player number
+            if index == 0:
+                value = -self.negamax(
+                    depth-1, 3-turn, -beta, -alpha, move, move_count + 1, cache)[0]
+            else:
+                if (reduce_late_moves and index >= self.lmr_moves and move not in killers
+                        and not self.board.winning_squares(turn) & ~threat_squares):
+                    value = -self.negamax(max(0, depth - 1 - self.lmr_reduction), 3-turn,
+                                          -alpha - 1, -alpha, move, move_count + 1, cache)[0]
+                else:
+                    value = alpha + 1
+                if value > alpha:
+                    value = -self.negamax(
+                        depth-1, 3-turn, -alpha - 1, -alpha, move, move_count + 1, cache)[0]
+                    if alpha < value < beta:
+                        value = -self.negamax(
+                            depth-1, 3-turn, -beta, -alpha, move, move_count + 1, cache)[0]
 
             self.board.undo_move(move)
-            move_count -= 1
 
-            if value < min_value:
-                min_value = value
+            if value > value_found:
+                value_found = value
                 best_move = move
-                cache[cache_key] = min_value, best_move
 
-            if value <= alpha:
-                break
-            beta = min(beta, value)
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    self._update_move_ordering(turn, move_count, move, depth)
+                    break
+
+        # Values outside the original window are only bounds on the real value
+        if value_found <= alpha_orig:
+            bound = UPPER_BOUND
+        elif value_found >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        cache.store(cache_key, depth, bound, _to_table_value(value_found, depth),
+                    WIDTH - 1 - best_move if mirrored else best_move)
 
-        return min_value, best_move
+        return value_found, best_move
 
     def get_possible_moves(self):
         """Finds all columns into which valid moves can be made at
@@ -174,25 +634,111 @@ class AI:
         Returns:
             sorted_moves: A set of possible columns, ordered according to the ideal move order.
         """
-        moves = []
-        ideal_move_order = [3, 2, 4, 1, 5, 0, 6]
+        heights = self.board.heights
+        return [column for column in IDEAL_MOVE_ORDER if heights[column] < HEIGHT]
 
-        for column in range(0, 7):
-            valid = self.board.check_valid_move(column)
-            if valid:
-                moves.append(column)
+    def generate_moves(self, turn, move_count, first_move=None):
+        """Generates the moves worth searching in stages, using the threats on the bitboards:
+        a move that wins right away is the only move returned. Otherwise, if the opponent
+        threatens to win with their next move, the move blocking the threat is the only one.
+        Moves that play directly below a square where the opponent would win are left out,
+        since the opponent would win by playing on top of them.
+        The remaining moves are ordered as in _order_moves.
 
-        sorted_moves = sorted(moves, key=lambda x: ideal_move_order.index(
-            x) if x in ideal_move_order else len(ideal_move_order))
+        Args:
+            turn (int): The player whose turn it is
+            move_count (int): The number of moves made in the game so far
+            first_move (int): Move to search first, e.g. the best move from the cache
 
-        return sorted_moves
+        Returns:
+            moves (list): The columns to search in order. Empty, if every move
+                          lets the opponent win with their next move.
+        """
+        winning_squares = self.board.winning_squares(turn) & self.board.possible_squares()
+        if winning_squares:
+            return [square_column(winning_squares)]
+        return self._non_losing_moves(turn, move_count, first_move)
+
+    def _non_losing_moves(self, turn, move_count, first_move=None):
+        """The stages of generate_moves after checking for a move that wins right away.
+
+        Args:
+            turn (int): The player whose turn it is
+            move_count (int): The number of moves made in the game so far
+            first_move (int): Move to search first, e.g. the best move from the cache
+
+        Returns:
+            moves (list): The columns to search in order. Empty, if every move
+                          lets the opponent win with their next move.
+        """
+        board = self.board
+        possible = board.possible_squares()
+        opponent_squares = board.winning_squares(3 - turn)
+        # Squares below the opponent's winning squares must not be played
+        losing_squares = opponent_squares >> 1
+        forced_squares = opponent_squares & possible
+        if forced_squares:
+            # Two threats cannot both be blocked, and blocking below another one loses too
+            if forced_squares & (forced_squares - 1) or forced_squares & losing_squares:
+                return []
+            return [square_column(forced_squares)]
+
+        safe_squares = possible & ~losing_squares
+        return [move for move in self._order_moves(turn, move_count, first_move)
+                if safe_squares & COLUMN_MASKS[move]]
+
+    def _order_moves(self, turn, move_count, first_move=None):
+        """Orders the possible moves for searching them, so that the best moves
+        are likely searched first and alpha-beta pruning can cut off the most.
+
+        The given first move comes first, then the killer moves of this ply,
+        i.e. moves that caused a beta cutoff in another position after as many moves,
+        and then the other moves by their history score for the square they land on.
+        Moves with the same history score stay in the ideal move order.
+
+        Args:
+            turn (int): The player whose turn it is
+            move_count (int): The number of moves made in the game so far
+            first_move (int): Move to search first, e.g. the best move from the cache
+
+        Returns:
+            moves (list): The possible columns in the order to search them
+        """
+        heights = self.board.heights
+        history = self.history_scores[turn]
+        moves = [column for column in IDEAL_MOVE_ORDER if heights[column] < HEIGHT]
+        moves.sort(key=lambda column: -history[column * COLUMN_BITS + heights[column]])
+
+        # Moved to the front in reverse order, so that first_move ends up first
+        killers = self.killers[move_count]
+        for move in (killers[1], killers[0], first_move):
+            if move is not None and move in moves:
+                moves.remove(move)
+                moves.insert(0, move)
+        return moves
+
+    def _update_move_ordering(self, turn, move_count, move, depth):
+        """Records a move that caused a beta cutoff as a killer move for its ply,
+        and raises the history score of its square, more for deeper searches.
+
+        Args:
+            turn (int): The player who made the move
+            move_count (int): The number of moves made before the move
+            move (int): Column of the move
+            depth (int): The remaining search depth at which the cutoff happened
+        """
+        killers = self.killers[move_count]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history_scores[turn][move * COLUMN_BITS + self.board.heights[move]] += depth * depth
 
     def _evaluate_window(self, window, turn):
         """Part of the heuristic evaluation of the board state
         Assigns points depending on how many pieces each player has
-        in the window of four squares. No point assignments happen
-        for four in a row, as this should be recognized and evaluated directly
-        by the minimax.
+        in the window of four squares, looked up from WINDOW_SCORES.
+        No point assignments happen for four in a row, as this should be
+        recognized and evaluated directly by the minimax.
 
         Args:
             window (list): A four-square section of the game board
@@ -202,26 +748,12 @@ class AI:
         Returns:
             score (int): The score assigned for the window.
         """
-
-        score = 0
-
-        # Giving points for favourable positions of the current player
-        if window.count(turn) == 3 and window.count(0) == 1:
-            score += 100
-        if window.count(turn) == 2 and window.count(0) == 2:
-            score += 10
-
-        # Subtracting points for favourable positions of the opponent
-        if window.count(3 - turn) == 3 and window.count(0) == 1:
-            score -= 100
-        if window.count(3 - turn) == 2 and window.count(0) == 2:
-            score -= 10
-
-        return score
+        return WINDOW_SCORES[turn][window.count(1) * 5 + window.count(2)]
 
     def evaluate_board(self, ai_player, turn):
-        """Main heuristic evaluation function. Splits the game board into window sections 
-        to be evaluated by the _evaluate_window function.
+        """Main heuristic evaluation function. The Board keeps the sum of the window
+        scores up to date as moves are made and undone, so this takes constant time.
+        The result is the same as scoring all windows with evaluate_board_full.
 
         Args:
             ai_player (int): The player number of the ai_player in the current game
@@ -230,36 +762,75 @@ class AI:
         Returns:
             score (int): The overall heuristic score of the position for the maximizing player.
         """
+        # The window scores are symmetric, so the score of the player whose turn it is,
+        # turned to the maximizing player's view, is just the score for that player.
+        if ai_player == 1:
+            return self.board.heuristic_score
+        return -self.board.heuristic_score
+
+    def evaluate_board_full(self, ai_player, turn):
+        """Heuristic evaluation of the whole board. Goes through all lines of four squares
+        (horizontal, vertical and diagonal windows) of the precomputed board.LINES
+        and looks up the score of each from WINDOW_SCORES, counting the pieces
+        of each player in a window from the bitboards.
+
+        Args:
+            ai_player (int): The player number of the ai_player in the current game
+            turn (int): The player whose turn it currently is
+
+        Returns:
+            score (int): The overall heuristic score of the position for the maximizing player,
+                            the same as from evaluate_board.
+        """
+        occupied = self.board.mask
+        player_one = self.board.position
+        player_two = occupied ^ player_one
+        window_scores = WINDOW_SCORES[turn]
+
         score = 0
-        # Checking windows in rows
-        for row in range(6):
-            for col in range(4):
-                window = [self.board.board[row][col], self.board.board[row][col + 1],
-                          self.board.board[row][col + 2], self.board.board[row][col + 3]]
-                score += self._evaluate_window(window, turn)
-
-        # Checking column windows
-        for row in range(3):
-            for col in range(7):
-                window = [self.board.board[row][col], self.board.board[row + 1][col],
-                          self.board.board[row + 2][col], self.board.board[row + 3][col]]
-                score += self._evaluate_window(window, turn)
-
-        # Checkinf right downward diagonals
-        for row in range(3):
-            for col in range(4):
-                window = [self.board.board[row][col], self.board.board[row + 1][col + 1],
-                          self.board.board[row + 2][col + 2], self.board.board[row + 3][col + 3]]
-                score += self._evaluate_window(window, turn)
-
-        # Checking left downward diagonals
-        for row in range(3):
-            for col in range(3, 7):
-                window = [self.board.board[row][col], self.board.board[row + 1][col - 1],
-                          self.board.board[row + 2][col - 2], self.board.board[row + 3][col - 3]]
-                score += self._evaluate_window(window, turn)
+        for line in LINES:
+            if occupied & line:
+                score += window_scores[(player_one & line).bit_count() * 5
+                                       + (player_two & line).bit_count()]
 
         # Return score depending on whether it is the maximising or minimizing player's turn.
         if ai_player == turn:
             return score
         return -score
+
+
+def _to_table_value(value, depth):
+    """Converts a search value for storing in the transposition table.
+    Win and loss scores contain the remaining depth at which the game ended,
+    so they are stored relative to the depth of the stored position instead.
+
+    Args:
+        value (int): The value found at the position
+        depth (int): The remaining search depth at the position
+
+    Returns:
+        The value to store in the table
+    """
+    if value > WIN_THRESHOLD:
+        return value - depth
+    if value < -WIN_THRESHOLD:
+        return value + depth
+    return value
+
+
+def _from_table_value(value, depth):
+    """Converts a value stored in the transposition table back to a search value
+    for a position at the given remaining depth. Reverses _to_table_value.
+
+    Args:
+        value (int): The stored value
+        depth (int): The remaining search depth at the position
+
+    Returns:
+        The search value
+    """
+    if value > WIN_THRESHOLD:
+        return value + depth
+    if value < -WIN_THRESHOLD:
+        return value - depth
+    return value
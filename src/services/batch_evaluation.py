@@ -0,0 +1,78 @@
+"""Heuristic evaluation of many boards at once with NumPy.
+
+Scores the same way as AI.evaluate_board, but for a whole batch of positions
+in a few array operations, e.g. for analysing or tuning on large sets of positions.
+NumPy is only needed for this module, not for playing the game.
+"""
+import numpy as np
+
+from services.board import HEIGHT, WIDTH, LINE_SQUARES, Board
+from services.evaluation import CODE_STEPS, WINDOW_SCORES
+
+
+def _window_matrix():
+    """Builds the matrix gathering the squares of every line of four.
+
+    Returns:
+        numpy.ndarray: Matrix of shape (HEIGHT * WIDTH, number of lines), where
+            [cell, line] is 1 if square number cell (row * WIDTH + col) is in the line
+            with that index in board.LINES, and 0 otherwise
+    """
+    matrix = np.zeros((HEIGHT * WIDTH, len(LINE_SQUARES)), dtype=np.float32)
+    for line, squares in enumerate(LINE_SQUARES):
+        for row, col in squares:
+            matrix[row * WIDTH + col, line] = 1
+    return matrix
+
+
+WINDOW_MATRIX = _window_matrix()
+
+# Window scores for player 1, indexed by the window code 5 * (pieces of player 1)
+# + (pieces of player 2) as in services.evaluation
+_SCORES = np.array(WINDOW_SCORES[1], dtype=np.int64)
+# What a square adds to the code of the windows it is in, indexed by its content
+_SQUARE_CODES = np.array(CODE_STEPS, dtype=np.float32)
+
+
+def stack_boards(boards):
+    """Stacks boards into one array for evaluate_boards.
+
+    Args:
+        boards (list): Board objects, or grids of HEIGHT rows and WIDTH columns
+
+    Returns:
+        numpy.ndarray: Array of shape (N, HEIGHT, WIDTH) and type int8
+    """
+    grids = [board.board if isinstance(board, Board) else board for board in boards]
+    return np.array(grids, dtype=np.int8).reshape(len(grids), HEIGHT, WIDTH)
+
+
+def evaluate_boards(boards, ai_player, turn):
+    """Heuristic evaluation of many boards, giving the same scores as
+    AI.evaluate_board for each of them.
+
+    Each square is turned into what it adds to the code of a window (5 for a piece
+    of player 1, 1 for a piece of player 2), so that one matrix product with the
+    WINDOW_MATRIX gives the codes of all windows of all boards. The window scores
+    are then looked up from the codes. The product is done in float32, which is
+    exact for these small integers and lets NumPy use its fast matrix routines.
+
+    Args:
+        boards (numpy.ndarray): Boards stacked into an array of shape (N, HEIGHT, WIDTH),
+                                holding 0 for empty squares and 1 or 2 for pieces
+        ai_player (int): The player number of the ai_player
+        turn (int): The player whose turn it is
+
+    Returns:
+        numpy.ndarray: The N scores for the maximizing player
+    """
+    cells = np.asarray(boards, dtype=np.int8).reshape(-1, HEIGHT * WIDTH)
+    codes = (_SQUARE_CODES[cells] @ WINDOW_MATRIX).astype(np.intp)
+
+    scores = _SCORES[codes].sum(axis=1)
+
+    # The window scores are symmetric, so the turn does not change the score
+    # from the maximizing player's view, see AI.evaluate_board
+    if ai_player == 1:
+        return scores
+    return -scores
@@ -1,21 +1,356 @@
-
 """Setting constants for board size"""
+import random
+from services.evaluation import LINE_SCORES
+
 WIDTH = 7
 HEIGHT = 6
 
+# Bitboard layout: each column uses HEIGHT + 1 bits, with bit 0 of a column being
+# the bottom square. The extra sentinel bit on top of each column keeps shifted
+# alignments from wrapping into the next column.
+COLUMN_BITS = HEIGHT + 1
+BOTTOM_MASK = sum(1 << (col * COLUMN_BITS) for col in range(WIDTH))
+BOARD_MASK = BOTTOM_MASK * ((1 << HEIGHT) - 1)
+TOP_MASKS = [1 << (HEIGHT - 1 + col * COLUMN_BITS) for col in range(WIDTH)]
+COLUMN_MASKS = [((1 << HEIGHT) - 1) << (col * COLUMN_BITS) for col in range(WIDTH)]
+
+# Columns from the centre outwards, the order in which moves are tried by default
+IDEAL_MOVE_ORDER = [3, 2, 4, 1, 5, 0, 6]
+
+# CELL_BITS[row][col] is the bit of square (row, col), row 0 being the top row
+CELL_BITS = [[1 << (col * COLUMN_BITS + HEIGHT - 1 - row) for col in range(WIDTH)]
+             for row in range(HEIGHT)]
+
+# Shifts between neighbouring squares in each direction
+VERTICAL = 1
+HORIZONTAL = COLUMN_BITS
+DIAGONAL_UP = COLUMN_BITS + 1  # right upward, i.e. rows get smaller, columns larger
+DIAGONAL_DOWN = COLUMN_BITS - 1  # right downward, i.e. rows and columns get larger
+
+
+def _build_lines():
+    """Lists all lines of four squares on the board, i.e. all the ways to win.
+
+    Returns:
+        A list of tuples of the four (row, col) squares of each line.
+    """
+    lines = []
+    # Directions in (row, col) steps: right, down, right downward, right upward
+    for row_step, col_step in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+        for row in range(HEIGHT):
+            for col in range(WIDTH):
+                squares = tuple((row + i * row_step, col + i * col_step) for i in range(4))
+                if all(0 <= r < HEIGHT and 0 <= c < WIDTH for r, c in squares):
+                    lines.append(squares)
+    return lines
+
+
+# LINE_SQUARES[i] holds the squares of line i, and LINES[i] its bitmask
+LINE_SQUARES = _build_lines()
+LINES = [sum(CELL_BITS[row][col] for row, col in squares) for squares in LINE_SQUARES]
+
+
+def _build_full_lines():
+    """Lists the full rows, columns and diagonals of the board that are long enough
+    to hold four connected. Every line of four lies in exactly one of them.
+
+    Returns:
+        A list of tuples of the (row, col) squares of each full line.
+    """
+    full_lines = []
+    # Directions in (row, col) steps: right, down, right downward, right upward
+    for row_step, col_step in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+        for row in range(HEIGHT):
+            for col in range(WIDTH):
+                # Only start from squares without a previous square in the line
+                if 0 <= row - row_step < HEIGHT and 0 <= col - col_step < WIDTH:
+                    continue
+                squares = []
+                square_row, square_col = row, col
+                while 0 <= square_row < HEIGHT and 0 <= square_col < WIDTH:
+                    squares.append((square_row, square_col))
+                    square_row, square_col = square_row + row_step, square_col + col_step
+                if len(squares) >= 4:
+                    full_lines.append(tuple(squares))
+    return full_lines
+
+
+# FULL_LINE_SQUARES[i] holds the squares of full line i in order, and FULL_LINE_SCORES[i]
+# the evaluation.LINE_SCORES table for its length
+FULL_LINE_SQUARES = _build_full_lines()
+FULL_LINE_SCORES = [LINE_SCORES[len(squares)] for squares in FULL_LINE_SQUARES]
+
+
+def _full_line_steps(player):
+    """Lists for each bitboard bit how a piece of the player on its square
+    changes the base 3 codes of the full lines through the square.
+
+    Args:
+        player (int): 1 or 2
+
+    Returns:
+        A list indexed by bit of tuples of (line index, code step, line score table)
+    """
+    steps = [() for bit in range(WIDTH * COLUMN_BITS)]
+    for index, squares in enumerate(FULL_LINE_SQUARES):
+        for position, (row, col) in enumerate(squares):
+            bit = CELL_BITS[row][col].bit_length() - 1
+            steps[bit] += ((index, player * 3 ** position, FULL_LINE_SCORES[index]),)
+    return steps
+
+
+# FULL_LINE_STEPS[player][bit], see _full_line_steps
+FULL_LINE_STEPS = [[], _full_line_steps(1), _full_line_steps(2)]
+
+# Random 64-bit Zobrist keys, ZOBRIST_KEYS[player][bit] for a piece of the player on the
+# square of that bitboard bit. The fixed seed keeps keys equal between runs and processes.
+_zobrist_random = random.Random(20240308)
+ZOBRIST_KEYS = [[]] + [[_zobrist_random.getrandbits(64) for bit in range(WIDTH * COLUMN_BITS)]
+                       for player in (1, 2)]
+# MIRROR_KEYS[player][bit] is the key of the square mirrored left to right, so that
+# the key of the mirrored position can be kept up to date along with the key itself
+MIRROR_KEYS = [[]] + [[ZOBRIST_KEYS[player][(WIDTH - 1 - bit // COLUMN_BITS) * COLUMN_BITS
+                                            + bit % COLUMN_BITS]
+                       for bit in range(WIDTH * COLUMN_BITS)] for player in (1, 2)]
+# Combined with the board key to tell apart positions with a different player to move
+TURN_KEYS = [0, 0, _zobrist_random.getrandbits(64)]
+
+# CELL_LINES[row][col] lists the masks of the lines of four through square (row, col)
+CELL_LINES = [[tuple(line for line, squares in zip(LINES, LINE_SQUARES) if (row, col) in squares)
+               for col in range(WIDTH)] for row in range(HEIGHT)]
+
+
+def _has_alignment(pieces, shift):
+    """Checks whether a bitboard contains four connected pieces in one direction.
+
+    Args:
+        pieces (int): Bitboard of the pieces of one player
+        shift (int): Bit distance between neighbouring squares in the direction
+
+    Returns:
+        True, if there are four connected pieces in that direction.
+        False, if not.
+    """
+    pairs = pieces & (pieces >> shift)
+    return pairs & (pairs >> (2 * shift)) != 0
+
+
+def alignment_squares(pieces):
+    """Finds the squares that would complete four connected with the given pieces,
+    whether they are empty or not.
+
+    Args:
+        pieces (int): Bitboard of the pieces of one player
+
+    Returns:
+        Bitboard of the squares, which may include occupied ones
+    """
+    # Three pieces below the square
+    squares = (pieces << 1) & (pieces << 2) & (pieces << 3)
+    for shift in (HORIZONTAL, DIAGONAL_UP, DIAGONAL_DOWN):
+        # The square is at either end of three pieces, or fills the gap in a line of four
+        before = pieces << shift
+        after = pieces >> shift
+        pair = before & (pieces << 2 * shift)
+        squares |= pair & ((pieces << 3 * shift) | after)
+        pair = after & (pieces >> 2 * shift)
+        squares |= pair & (before | (pieces >> 3 * shift))
+    return squares & BOARD_MASK
+
+
+def square_column(squares):
+    """Gives the column of the lowest bit of a bitboard of squares.
+
+    Args:
+        squares (int): Bitboard with at least one square set
+
+    Returns:
+        The column index of the lowest square
+    """
+    return ((squares & -squares).bit_length() - 1) // COLUMN_BITS
+
+
+class _GridRow(list):
+    """One row of the Board.board grid view. Writing a square through the row
+    also updates the bitboards of the board it belongs to.
+    """
+
+    def __init__(self, owner, row):
+        position, mask = owner.position, owner.mask
+        super().__init__((1 if position & cell else 2) if mask & cell else 0
+                         for cell in CELL_BITS[row])
+        self._owner = owner
+        self._row = row
+
+    def __setitem__(self, column_index, value):
+        super().__setitem__(column_index, value)
+        self._owner._set_square_content(self._row, column_index, value)
+
 
 class Board:
 
     """ This class creates the game board, enables making moves on the board,
         including checking valid moves and wins,
         and stores the current state of the board.
+
+        The position is stored as two bitboards, one holding the pieces of player 1
+        and one holding all occupied squares, plus the height of each column.
+        The pieces of player 2 are the occupied squares that are not player 1's.
     """
 
     def __init__(self):
         """Class constructor                
         """
-        self.board = [[0 for i in range(WIDTH)] for j in range(
-            HEIGHT)]  # 0 represents empty cell
+        self.position = 0  # pieces of player 1
+        self.mask = 0  # all occupied squares
+        self.heights = [0] * WIDTH
+        self.history = []  # columns of the moves made, most recent last
+        self._key = 0
+        self._mirror_key = 0
+        # Base 3 code of the content of each line in FULL_LINE_SQUARES, and the sum
+        # of the window scores for player 1, both updated by make_move and undo_move
+        self.line_codes = [0] * len(FULL_LINE_SQUARES)
+        self.heuristic_score = 0
+        self._grid = None
+
+    @property
+    def board(self):
+        """Grid view of the board, built lazily from the bitboards.
+        0 represents an empty cell, row 0 is the top row.
+
+        Returns:
+            A list of HEIGHT rows of WIDTH squares each.
+            Assigning a square in a row also changes the board.
+        """
+        if self._grid is None:
+            self._grid = [_GridRow(self, row) for row in range(HEIGHT)]
+        return self._grid
+
+    @board.setter
+    def board(self, grid):
+        """Sets the whole board from a grid of HEIGHT rows and WIDTH columns.
+
+        Args:
+            grid (list): Rows of squares containing 0, 1 or 2
+        """
+        self.position = 0
+        self.mask = 0
+        for row in range(HEIGHT):
+            for col in range(WIDTH):
+                if grid[row][col] != 0:
+                    self.mask |= CELL_BITS[row][col]
+                    if grid[row][col] == 1:
+                        self.position |= CELL_BITS[row][col]
+        self._sync_state()
+        self.history = []
+        self._grid = None
+
+    def _set_square_content(self, row_index, column_index, value):
+        """Sets the content of a single square, used by the grid view.
+
+        Args:
+            row_index (int): integer representing the chosen row
+            column_index (int): integer representing the chosen column
+            value (int): 0 for an empty square, otherwise the player number
+        """
+        cell = CELL_BITS[row_index][column_index]
+        self.position &= ~cell
+        self.mask &= ~cell
+        if value != 0:
+            self.mask |= cell
+            if value == 1:
+                self.position |= cell
+        self._sync_state()
+        self.history = []
+
+    @property
+    def last_move(self):
+        """Column of the most recent move, None if there is no known move,
+        e.g. after setting the board through the grid view.
+        """
+        if self.history:
+            return self.history[-1]
+        return None
+
+    @property
+    def key(self):
+        """64-bit Zobrist hash of the position, updated incrementally
+        by make_move and undo_move.
+        """
+        return self._key
+
+    @property
+    def mirror_key(self):
+        """Zobrist hash of the position mirrored left to right, updated incrementally
+        by make_move and undo_move.
+        """
+        return self._mirror_key
+
+    @property
+    def canonical_key(self):
+        """Key shared by the position and its mirror image: the smaller one
+        of key and mirror_key. Since the game is symmetric, both positions
+        have the same value, with moves mirrored.
+        """
+        return min(self._key, self._mirror_key)
+
+    def _sync_state(self):
+        """Recomputes the column heights, the Zobrist hashes, the window codes
+        and the heuristic score from the bitboards.
+        The heights count the pieces stacked from the bottom of each column.
+        """
+        key = 0
+        mirror_key = 0
+        for col in range(WIDTH):
+            height = 0
+            while height < HEIGHT and self.mask & (1 << (col * COLUMN_BITS + height)):
+                height += 1
+            self.heights[col] = height
+            for bit in range(col * COLUMN_BITS, col * COLUMN_BITS + HEIGHT):
+                if self.mask & (1 << bit):
+                    player = 1 if self.position & (1 << bit) else 2
+                    key ^= ZOBRIST_KEYS[player][bit]
+                    mirror_key ^= MIRROR_KEYS[player][bit]
+        self._key = key
+        self._mirror_key = mirror_key
+
+        self.line_codes = [sum(self._check_square_content(row, col) * 3 ** position
+                               for position, (row, col) in enumerate(squares))
+                           for squares in FULL_LINE_SQUARES]
+        self.heuristic_score = sum(scores[code]
+                                   for scores, code in zip(FULL_LINE_SCORES, self.line_codes))
+
+    def _player_pieces(self, player):
+        """Returns the bitboard of the given square content.
+
+        Args:
+            player (int): 1 or 2 for the pieces of that player, 0 for empty squares
+        """
+        if player == 1:
+            return self.position
+        if player == 2:
+            return self.mask ^ self.position
+        return BOARD_MASK & ~self.mask
+
+    def possible_squares(self):
+        """Finds the squares where the next token of each non-full column would land.
+
+        Returns:
+            Bitboard of the squares
+        """
+        return (self.mask + BOTTOM_MASK) & BOARD_MASK
+
+    def winning_squares(self, player):
+        """Finds the empty squares where a token of the player would complete four connected,
+        whether they can be played right away or only later.
+
+        Args:
+            player (int): 1 or 2
+
+        Returns:
+            Bitboard of the squares
+        """
+        return alignment_squares(self._player_pieces(player)) & ~self.mask
 
     def check_valid_move(self, column_index):
         """Checks if a token can be dropped into the chosen column
@@ -26,10 +361,7 @@ class Board:
             True, if the column is not full yet
             False, if the column is already full
         """
-        if 0 <= column_index <= 6:
-            if self.board[0][column_index] == 0:
-                return True
-        return False
+        return 0 <= column_index < WIDTH and not self.mask & TOP_MASKS[column_index]
 
     def make_move(self, column_index, current_player):
         """Makes a move if it is valid and no one has won yet.
@@ -44,22 +376,69 @@ class Board:
         """
 
         if self.check_valid_move(column_index):
-            free_row = self._check_highest_square(column_index)
-            self.board[free_row][column_index] = current_player
+            bit = column_index * COLUMN_BITS + self.heights[column_index]
+            move = 1 << bit
+            self.mask |= move
+            if current_player == 1:
+                self.position |= move
+            self._key ^= ZOBRIST_KEYS[current_player][bit]
+            self._mirror_key ^= MIRROR_KEYS[current_player][bit]
+
+            codes = self.line_codes
+            score = self.heuristic_score
+            for index, step, scores in FULL_LINE_STEPS[current_player][bit]:
+                code = codes[index]
+                score += scores[code + step] - scores[code]
+                codes[index] = code + step
+            self.heuristic_score = score
+            self.heights[column_index] += 1
+            self.history.append(column_index)
+            self._grid = None
             return True
         return False
 
-    def undo_move(self, column_index):
+    def undo_move(self, column_index=None):
         """Unmakes the most recent move.
 
         Args:
-            column_index (int): integer representing the chosen column
+            column_index (int): integer representing the chosen column,
+                by default the column of the last move in the move history
+
+        Returns:
+            The column of the undone move (int), or None if there was nothing to undo
         """
-        if self.check_valid_move(column_index):
-            free_row = self._check_highest_square(column_index)
-            self.board[free_row + 1][column_index] = 0
-        else:
-            self.board[0][column_index] = 0
+        history = self.history
+        if column_index is None:
+            if not history:
+                return None
+            column_index = history.pop()
+        elif history and history[-1] == column_index:
+            history.pop()
+        elif column_index in history:
+            # Undoing an older move, e.g. after the top piece was set through the grid view
+            del history[len(history) - 1 - history[::-1].index(column_index)]
+
+        if self.heights[column_index] == 0:
+            return None
+        self.heights[column_index] -= 1
+        bit = column_index * COLUMN_BITS + self.heights[column_index]
+        move = 1 << bit
+        player = 1 if self.position & move else 2
+        self._key ^= ZOBRIST_KEYS[player][bit]
+        self._mirror_key ^= MIRROR_KEYS[player][bit]
+        self.mask &= ~move
+        self.position &= ~move
+
+        codes = self.line_codes
+        score = self.heuristic_score
+        for index, step, scores in FULL_LINE_STEPS[player][bit]:
+            code = codes[index]
+            score += scores[code - step] - scores[code]
+            codes[index] = code - step
+        self.heuristic_score = score
+
+        self._grid = None
+        return column_index
 
     def _check_highest_square(self, column_index):
         """Checks which square in the column is the highest free one,
@@ -74,46 +453,63 @@ class Board:
                 since before calling this function, there is always the
                 check_valid_move function to see whether the column is full.
         """
-        for row in range(5, -1, -1):
-            if self.board[row][column_index] == 0:
-                return row
+        if self.heights[column_index] < HEIGHT:
+            return HEIGHT - 1 - self.heights[column_index]
         return None
 
     def check_four_connected(self):
         """Checks if any player has four pieces in a row, a column or diagonal.
 
-        Args:
-            column_index (int): integer representing the chosen column
-
         Returns:
             True, any player has 4 connected.
             False, if no win has been achieved by anyone.
         """
+        for pieces in (self.position, self.mask ^ self.position):
+            for shift in (VERTICAL, HORIZONTAL, DIAGONAL_UP, DIAGONAL_DOWN):
+                if _has_alignment(pieces, shift):
+                    return True
+        return False
 
-        if self._check_all_rows() or self._check_all_cols() or self._check_diag_whole_board():
-            return True
+    def check_win(self, column_index=None, row_index=None):
+        """Checks if the piece on a square is part of four connected, only looking
+        at the lines passing through that square. After a move, only these lines
+        can have changed, so this is enough to find out whether the move won.
+
+        Args:
+            column_index (int): Column of the square, by default the column of the last move
+            row_index (int): Row of the square, by default the highest piece in the column
+
+        Returns:
+            True, if the piece on the square is part of four connected.
+            False, if not, or if the square is empty.
+        """
+        if column_index is None:
+            column_index = self.last_move
+            if column_index is None:
+                return False
+        if row_index is None:
+            if self.heights[column_index] == 0:
+                return False
+            row_index = HEIGHT - self.heights[column_index]
+
+        cell = CELL_BITS[row_index][column_index]
+        if not self.mask & cell:
+            return False
+        pieces = self.position if self.position & cell else self.mask ^ self.position
+        for line in CELL_LINES[row_index][column_index]:
+            if pieces & line == line:
+                return True
         return False
 
     def _check_all_cols(self):
         """Checks if there are four connected of any player in any column of the board.
 
-        This works as follows: We iterate through the first three rows, 
-        and for each column in those rows, we call the _check_col function.
-        This function checks whether there is four connected in that column
-        starting from the given square (row, col). We only need to check the first three rows, 
-        as there is 6 rows in total, so there cannot be four connected in a column starting
-        any lower than the third row from the top (row index 2).
-
         Returns:
             True, if any player has four connected in some column
             False, if not.
         """
-        for row in range(3):
-            for col in range(7):
-                if self.board[row][col] != 0:
-                    if self._check_col(row, col):
-                        return True
-        return False
+        return (_has_alignment(self.position, VERTICAL)
+                or _has_alignment(self.mask ^ self.position, VERTICAL))
 
     def _check_col(self, row, col):
         """Checks if there are four connected in a column starting
@@ -129,31 +525,17 @@ class Board:
             True, if there are four connected in that part of the column.
             False, if not.
         """
-        piece = self.board[row][col]
-        for i in range(1, 4):
-            if self.board[row+i][col] != piece:
-                return False
-        return True
+        return self._check_line(row, col, -VERTICAL)
 
     def _check_all_rows(self):
         """Checks if there are four connected of any player in any row of the board.
 
-        This works as follows: We iterate through the first four columns, 
-        and for each row in those columns, we call the _check_row function.
-        This function checks whether there is four connected in that row
-        starting from the given square (row, col). We only need to check the first four columns, 
-        as there is 7 columns in total, so there cannot be four connected in a column starting
-        any lower than the fourth column from the left (column index 3).
-
         Returns:
-            winner (int or None): If there is a win, the number of the winning player
+            True, if any player has four connected in some row
+            False, if not.
         """
-        for col in range(4):
-            for row in range(6):
-                if self.board[row][col] != 0:
-                    if self._check_row(row, col):
-                        return True
-        return False
+        return (_has_alignment(self.position, HORIZONTAL)
+                or _has_alignment(self.mask ^ self.position, HORIZONTAL))
 
     def _check_row(self, row, col):
         """Checks if there are four connected in a row starting from the row and column index given.
@@ -168,41 +550,20 @@ class Board:
             True, if there are four connected.
             False, if not.
         """
-        piece = self.board[row][col]
-        for i in range(1, 4):
-            if self.board[row][col+i] != piece:
-                return False
-        return True
+        return self._check_line(row, col, HORIZONTAL)
 
     def _check_diag_whole_board(self):
-        """Checks if there are four connected of any player in any diagonal of the board.
-
-        First, iterates through the first three rows and first four columns of the board,
-        and checks from each square whether there are four connected in a right downward diagonal
-        (in the direction of greater rows and greater columns) starting from the square.
-        We can stop after the first three rows and four columns, because in any later column or row,
-        there are no longer three more squares in the right downward diagonal.
-
-        Then, starts from the bottom left corner of the board, repeating the above process but going
-        up the last three rows, and checking right upward diagnoals
-        (rows get smaller, columns larger).
-        The same note about not needing to check all rows and columns applies.
+        """Checks if there are four connected of any player in any diagonal of the board,
+        both in right upward (rows get smaller, columns larger)
+        and right downward (rows and columns get larger) direction.
 
         Returns:
             True, if there are four connected.
             False, if not.
         """
-        for row in range(0, 3):
-            for col in range(0, 4):
-                if self.board[row][col] != 0:
-                    if self._check_right_down_diagonals(row, col):
-                        return True
-
-        for row in range(5, 2, -1):
-            for col in range(0, 4):
-                if self.board[row][col] != 0:
-                    if self._check_right_up_diagonals(row, col):
-                        return True
+        for pieces in (self.position, self.mask ^ self.position):
+            if _has_alignment(pieces, DIAGONAL_UP) or _has_alignment(pieces, DIAGONAL_DOWN):
+                return True
         return False
 
     def _check_right_down_diagonals(self, row, col):
@@ -217,11 +578,7 @@ class Board:
             True, if there are four connected.
             False, if not.
         """
-        piece = self.board[row][col]
-        for i in range(1, 4):
-            if self.board[row+i][col+i] != piece:
-                return False
-        return True
+        return self._check_line(row, col, DIAGONAL_DOWN)
 
     def _check_right_up_diagonals(self, row, col):
         """Checks if there are four connected in a right upward diagonal
@@ -235,16 +592,41 @@ class Board:
             True, if there are four connected.
             False, if not.
         """
-        piece = self.board[row][col]
-        for i in range(1, 4):
-            if self.board[row-i][col+i] != piece:
+        return self._check_line(row, col, DIAGONAL_UP)
+
+    def _check_line(self, row, col, shift):
+        """Checks whether the square (row, col) and the next three squares in the
+        direction given by the bit shift all have the same content.
+
+        Args:
+            row (int): Starting row index
+            col (int): Starting column index
+            shift (int): Bit distance to the next square, negative to shift downwards
+
+        Returns:
+            True, if there are four connected.
+            False, if not.
+        """
+        pieces = self._player_pieces(self._check_square_content(row, col))
+        cell = CELL_BITS[row][col]
+        for _ in range(3):
+            cell = cell << shift if shift > 0 else cell >> -shift
+            if not pieces & cell:
                 return False
         return True
 
     def clear_board(self):
         """Empties whole board
         """
-        self.board = [[0 for i in range(WIDTH)] for j in range(HEIGHT)]
+        self.position = 0
+        self.mask = 0
+        self.heights = [0] * WIDTH
+        self.history = []
+        self._key = 0
+        self._mirror_key = 0
+        self.line_codes = [0] * len(FULL_LINE_SQUARES)
+        self.heuristic_score = 0
+        self._grid = None
 
     def _check_square_content(self, row_index, column_index):
         """Returns the content of a specified square
@@ -255,4 +637,9 @@ class Board:
         Returns:
             The content of the specified square (int)
         """
-        return self.board[row_index][column_index]
+        cell = CELL_BITS[row_index][column_index]
+        if not self.mask & cell:
+            return 0
+        if self.position & cell:
+            return 1
+        return 2
@@ -0,0 +1,73 @@
+"""Heuristic scores of the windows of four squares on the board"""
+
+
+def window_score(own_count, opponent_count):
+    """Part of the heuristic evaluation of the board state
+    Assigns points depending on how many pieces each player has
+    in a window of four squares. No point assignments happen
+    for four in a row, as this should be recognized and evaluated directly
+    by the minimax.
+
+    Args:
+        own_count (int): Number of pieces of the player whose turn it is in the window
+        opponent_count (int): Number of pieces of the opponent in the window
+
+    Returns:
+        score (int): The score assigned for the window.
+    """
+    empty_count = 4 - own_count - opponent_count
+    score = 0
+
+    # Giving points for favourable positions of the current player
+    if own_count == 3 and empty_count == 1:
+        score += 100
+    if own_count == 2 and empty_count == 2:
+        score += 10
+
+    # Subtracting points for favourable positions of the opponent
+    if opponent_count == 3 and empty_count == 1:
+        score -= 100
+    if opponent_count == 2 and empty_count == 2:
+        score -= 10
+
+    return score
+
+
+# A window's score only depends on how many pieces of each player it holds.
+# Windows are coded as 5 * (pieces of player 1) + (pieces of player 2), and
+# WINDOW_SCORES[turn][code] is the score of a window when it is the given player's turn.
+WINDOW_SCORES = [[],
+                 [window_score(code // 5, code % 5) for code in range(25)],
+                 [window_score(code % 5, code // 5) for code in range(25)]]
+
+# How much a piece adds to the window code of each player
+CODE_STEPS = [0, 5, 1]
+
+
+def line_scores(length):
+    """Builds the table of the total score of all windows in a full line of the board
+    (a row, column or diagonal), for every possible content of the line.
+
+    The content is coded in base 3, digit i being the content of square i of the line
+    (0 for empty, or the player number). Since the window scores are symmetric,
+    the scores are given for player 1 only, the score for player 2 is the opposite.
+
+    Args:
+        length (int): Number of squares in the line, at least 4
+
+    Returns:
+        list: The scores for player 1, indexed by the code of the line's content
+    """
+    scores = []
+    for code in range(3 ** length):
+        squares = [code // 3 ** i % 3 for i in range(length)]
+        score = 0
+        for start in range(length - 3):
+            window = squares[start:start + 4]
+            score += WINDOW_SCORES[1][window.count(1) * 5 + window.count(2)]
+        scores.append(score)
+    return scores
+
+
+# LINE_SCORES[length] is the line_scores table for lines of that length
+LINE_SCORES = [[] if length < 4 else line_scores(length) for length in range(8)]
@@ -0,0 +1,178 @@
+"""Lazy SMP: parallel search with several processes sharing one transposition table"""
+import multiprocessing
+import os
+from contextlib import redirect_stdout
+from services.ai import AI
+from services.board import Board
+from services.tablebase import Tablebase
+from services.time_manager import TimeManager
+from services.transposition import DEFAULT_SIZE_MB, SharedTranspositionTable
+
+
+class _HelperTimeManager(TimeManager):
+    """Time manager of a helper process, which also stops when the main process
+    has finished its search.
+    """
+
+    def __init__(self, stop):
+        """Class constructor
+
+        Args:
+            stop (multiprocessing.Event): Set by the main process when the move is made
+        """
+        super().__init__()
+        self.stop = stop
+
+    def can_start_depth(self):
+        return not self.stop.is_set() and super().can_start_depth()
+
+    def time_up(self, share=1):
+        return self.stop.is_set() or super().time_up(share)
+
+
+def _helper(connection, stop, table_name, table_size_mb, tablebase_path, settings, start_depth):
+    """Main loop of a helper process: searches the positions sent by the main process
+    and sends back the results, until it gets None.
+
+    Args:
+        connection (Connection): Pipe to the main process
+        stop (multiprocessing.Event): Set by the main process when the move is made
+        table_name (str): Name of the shared memory of the transposition table
+        table_size_mb (float): Size of the transposition table
+        tablebase_path (str): Path of the endgame tablebase file, None for no tablebase
+        settings (dict): Other arguments of the AI
+        start_depth (int): The first depth of the helper's iterative deepening
+    """
+    table = SharedTranspositionTable(table_size_mb, name=table_name)
+    board = Board()
+    # The tablebase is memory-mapped again, sharing the pages of the main process
+    tablebase = Tablebase(tablebase_path) if tablebase_path is not None else None
+    ai = AI(board, transposition_table=table, time_manager=_HelperTimeManager(stop),
+            tablebase=tablebase, start_depth=start_depth, **settings)
+
+    # The main process reports on the game, the helpers stay quiet
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        while True:
+            task = connection.recv()
+            if task is None:
+                break
+            if task == "new_game":
+                ai.new_game()
+                continue
+            grid, ai_player, move_count, max_depth, move_time = task
+            board.board = grid
+            ai.nodes = 0
+            ai.time_manager.move_time = move_time
+            move = ai.next_move(ai_player, move_count, max_depth)
+            connection.send((ai.completed_depth, move, ai.nodes))
+
+    table.close()
+    if tablebase is not None:
+        tablebase.close()
+
+
+class LazySMP:
+    """Parallel search: helper processes run the same iterative deepening as the main process,
+    sharing its transposition table. There is no other communication during the search, the
+    processes simply find the positions the others have searched in the table. The helpers
+    at odd positions start their iterative deepening one depth deeper, so that the processes
+    do not all search the same depth at the same time. The move is taken from the process
+    that completed the deepest search, from the main process if several did.
+
+    Used like AI, with the same next_move and new_game, and close to stop the helpers.
+    """
+
+    def __init__(self, board: Board, workers=None, table_size_mb=DEFAULT_SIZE_MB,
+                 time_manager=None, **settings):
+        """Class constructor
+
+        Args:
+            board (Board): The game board
+            workers (int): Number of processes searching, the main process included,
+                           by default one per CPU core
+            table_size_mb (float): Memory for the shared transposition table in megabytes
+            time_manager (TimeManager): Decides the time of each move, see AI
+            settings: Other arguments of the AI, for all processes. The helpers make no moves
+                      from the opening book, since the main process makes them right away.
+        """
+        self.board = board
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.table = SharedTranspositionTable(table_size_mb)
+        self.ai = AI(board, transposition_table=self.table, time_manager=time_manager,
+                     **settings)
+        self.nodes = 0
+        self.completed_depth = 0
+
+        tablebase = settings.get("tablebase")
+        helper_settings = {name: value for name, value in settings.items()
+                           if name not in ("opening_book", "tablebase")}
+
+        # Spawned rather than forked processes work the same on every platform, they only
+        # share the table, and the Zobrist keys are the same in every process
+        context = multiprocessing.get_context("spawn")
+        self._stop = context.Event()
+        self._connections = []
+        self._processes = []
+        for index in range(1, self.workers):
+            connection, helper_connection = context.Pipe()
+            process = context.Process(
+                target=_helper, daemon=True,
+                args=(helper_connection, self._stop, self.table.name, table_size_mb,
+                      tablebase.path if tablebase is not None else None, helper_settings,
+                      1 + index % 2))
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def new_game(self):
+        """Empties the transposition table and the move ordering heuristics of all processes,
+        and resets the game clock before a new game.
+        """
+        self.ai.new_game()
+        for connection in self._connections:
+            connection.send("new_game")
+
+    def next_move(self, ai_player, move_count, max_depth=None):
+        """Finds the next move to make with all processes, see AI.next_move.
+
+        Args:
+            ai_player (int): Which player (1 or 2) the AI is playing
+            move_count (int): Moves in the game so far
+            max_depth (int): The deepest search of iterative deepening,
+                             by default the AI's max_depth
+
+        Returns:
+            best_move (int): The column into which the AI makes its next move.
+        """
+        # The helpers get the time the main process's time manager gives the move
+        time_manager = self.ai.time_manager
+        time_manager.start_move(move_count)
+        move_time = time_manager.deadline - time_manager.start_time
+
+        self._stop.clear()
+        # The grid as plain lists, since its rows refer to the whole board
+        grid = [list(row) for row in self.board.board]
+        task = (grid, ai_player, move_count, max_depth, move_time)
+        for connection in self._connections:
+            connection.send(task)
+
+        self.ai.nodes = 0
+        move = self.ai.next_move(ai_player, move_count, max_depth)
+        self._stop.set()
+        results = [(self.ai.completed_depth, move, self.ai.nodes)]
+        results += [connection.recv() for connection in self._connections]
+
+        self.nodes = sum(nodes for _, _, nodes in results)
+        self.completed_depth, best_move, _ = max(results, key=lambda result: result[0])
+        return best_move
+
+    def close(self):
+        """Stops the helper processes and frees the shared transposition table.
+        """
+        for connection in self._connections:
+            connection.send(None)
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+        self.table.close()
@@ -0,0 +1,125 @@
+"""Opening book: the AI's moves for the first positions of the game, searched in advance
+and stored in a sorted binary file"""
+import math
+import os
+from services.ai import AI
+from services.board import Board, WIDTH
+from services.position_file import PositionFile, write_position_file
+from services.time_manager import TimeManager
+
+# Default location of the book file, src/data/opening_book.bin
+BOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "data", "opening_book.bin")
+
+# Default number of moves into the game the book covers, and the depth of its searches
+BOOK_PLIES = 8
+BOOK_DEPTH = 8
+
+MAGIC = b"C4BOOK01"
+
+
+class OpeningBook(PositionFile):
+    """A book file, storing the best move for the player to move in each position.
+    """
+
+    def __init__(self, path):
+        """Class constructor
+
+        Args:
+            path (str): Path of the book file
+
+        Raises:
+            ValueError: If the file is not a book file
+        """
+        super().__init__(path, MAGIC)
+        self.plies = self.limit
+
+    def lookup(self, board):
+        """Looks up the book move for the position on the board.
+
+        Mirrored positions share a record, stored for the one with the smaller key,
+        as in the transposition table.
+
+        Args:
+            board (Board): The game board
+
+        Returns:
+            The column of the book move, or None if the position is not in the book
+        """
+        key, mirror_key = board.key, board.mirror_key
+        mirrored = mirror_key < key
+        move = self.find(mirror_key if mirrored else key)
+        if move is None:
+            return None
+        return WIDTH - 1 - move if mirrored else move
+
+
+def load_book(path=BOOK_PATH):
+    """Opens the book file if it exists.
+
+    Args:
+        path (str): Path of the book file
+
+    Returns:
+        The OpeningBook, or None if there is no book file
+    """
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+def generate_book(path=BOOK_PATH, plies=BOOK_PLIES, depth=BOOK_DEPTH):
+    """Generates the opening book by searching the AI's move in every position it can reach
+    in the first moves of the game, whether it plays first or second, and writes it to a file.
+
+    At the AI's turns only the book move is followed, and at the opponent's turns every move,
+    so the book holds every position the AI can meet while following the book.
+
+    Args:
+        path (str): Path of the book file
+        plies (int): Number of moves into the game the book covers
+        depth (int): Depth of the searches of the book moves
+
+    Returns:
+        The number of positions in the book
+    """
+    board = Board()
+    ai = AI(board, max_depth=depth, time_manager=TimeManager(move_time=math.inf))
+    entries = {}
+    for book_player in (1, 2):
+        _add_positions(board, ai, 0, plies, book_player, entries, set())
+    write_position_file(path, MAGIC, plies, entries)
+    return len(entries)
+
+
+def _add_positions(board, ai, move_count, plies, book_player, entries, visited):
+    """Adds the book moves of the position on the board and the positions following it.
+
+    Args:
+        board (Board): The game board, with the position to add
+        ai (AI): The AI searching the book moves
+        move_count (int): Moves in the game so far
+        plies (int): Number of moves into the game the book covers
+        book_player (int): The player the AI plays
+        entries (dict): The book moves found so far, keyed by canonical key
+        visited (set): Canonical keys of the positions already added for book_player
+    """
+    key, mirror_key = board.key, board.mirror_key
+    canonical_key = min(key, mirror_key)
+    if move_count >= plies or canonical_key in visited:
+        return
+    visited.add(canonical_key)
+
+    turn = move_count % 2 + 1
+    if turn == book_player:
+        move = ai.next_move(turn, move_count)
+        entries[canonical_key] = WIDTH - 1 - move if mirror_key < key else move
+        moves = [move]
+    else:
+        moves = ai.get_possible_moves()
+
+    for move in moves:
+        board.make_move(move, turn)
+        if not board.check_win(move):
+            _add_positions(board, ai, move_count + 1, plies, book_player, entries, visited)
+        board.undo_move(move)
@@ -0,0 +1,86 @@
+"""Files of one byte of information per position, sorted by position key and memory-mapped,
+used by the opening book and the endgame tablebase"""
+import bisect
+import mmap
+import os
+import struct
+from array import array
+
+# The file starts with a header of a magic string telling the kind of file and a one-byte limit,
+# the number of moves or empty squares the file covers, padded to 16 bytes. It is followed by
+# the sorted canonical keys of the positions as 64-bit integers, and then by the byte of
+# information of each position in the same order. The keys are in the machine's byte order,
+# so that the binary search can read them as an array of integers without unpacking them.
+HEADER = struct.Struct("<8sB7x")
+KEY_SIZE = 8
+
+
+class PositionFile:
+    """A file of positions, memory-mapped so that looking up a position reads only the few
+    pages the binary search touches, and processes using the same file share the pages.
+    """
+
+    def __init__(self, path, magic):
+        """Class constructor
+
+        Args:
+            path (str): Path of the file
+            magic (bytes): The magic string of the kind of file expected
+
+        Raises:
+            ValueError: If the file is not of the expected kind
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._data) < HEADER.size or self._data[:len(magic)] != magic:
+            self._data.close()
+            self._file.close()
+            raise ValueError(f"{path} is not a {magic.decode()} file")
+        self.limit = HEADER.unpack_from(self._data)[1]
+        self._count = (len(self._data) - HEADER.size) // (KEY_SIZE + 1)
+        self._values_start = HEADER.size + self._count * KEY_SIZE
+        self._keys = memoryview(self._data)[HEADER.size:self._values_start].cast("Q")
+
+    def __len__(self):
+        return self._count
+
+    def find(self, key):
+        """Finds a position by binary search.
+
+        Args:
+            key (int): The canonical key of the position
+
+        Returns:
+            The byte stored for the position, or None if the position is not in the file
+        """
+        index = bisect.bisect_left(self._keys, key)
+        if index == self._count or self._keys[index] != key:
+            return None
+        return self._data[self._values_start + index]
+
+    def close(self):
+        """Closes the file.
+        """
+        self._keys.release()
+        self._data.close()
+        self._file.close()
+
+
+def write_position_file(path, magic, limit, entries):
+    """Writes a file of positions.
+
+    Args:
+        path (str): Path of the file
+        magic (bytes): The magic string of the kind of file
+        limit (int): The number of moves or empty squares the file covers
+        entries (dict): The byte stored for each position, keyed by its canonical key
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    keys = sorted(entries)
+    with open(path, "wb") as position_file:
+        position_file.write(HEADER.pack(magic, limit))
+        position_file.write(array("Q", keys).tobytes())
+        position_file.write(bytes(entries[key] for key in keys))
@@ -0,0 +1,284 @@
+"""Exact solver for positions close to the end of the game"""
+from array import array
+from services.board import (BOARD_MASK, BOTTOM_MASK, COLUMN_MASKS, HEIGHT, IDEAL_MOVE_ORDER,
+                            WIDTH, alignment_squares, square_column)
+from services.time_manager import CHECK_INTERVAL, SearchTimeout
+
+CELLS = WIDTH * HEIGHT
+
+# Default memory for the table of the solver in megabytes
+SOLVER_TABLE_MB = 16
+# Each slot of the table takes a 64-bit key and a byte for the score
+SOLVER_SLOT_BYTES = 9
+# Scores are stored with this offset, so that all stored scores are positive and 0 is an empty slot
+_SCORE_OFFSET = 64
+
+
+def _half(value):
+    """Halves an integer, rounding towards zero like the score formulas assume.
+
+    Args:
+        value (int): The integer to halve
+
+    Returns:
+        The halved integer
+    """
+    return value // 2 if value >= 0 else -(-value // 2)
+
+
+def result_distance(score, move_count):
+    """Gives the number of moves until the end of the game for a solved position,
+    counting the moves of both players and the final move.
+
+    Args:
+        score (int): Score of the position for the player to move, see Solver
+        move_count (int): The number of moves made in the game so far
+
+    Returns:
+        The number of moves until the game is won, lost or drawn with perfect play
+    """
+    if score == 0:
+        return CELLS - move_count
+    if score > 0:
+        # The winning move is made when (CELLS + 1 - 2 * score) or one less moves have been made,
+        # whichever has the parity of the player to move
+        moves_before_win = CELLS - 2 * score + move_count % 2
+        return moves_before_win - move_count + 1
+    moves_before_loss = CELLS + 2 * score + (move_count + 1) % 2
+    return moves_before_loss - move_count + 1
+
+
+def _prime_below(number):
+    """Finds the largest prime number not above the given number.
+
+    Args:
+        number (int): The upper limit, at least 2
+
+    Returns:
+        The prime number
+    """
+    while any(number % divisor == 0 for divisor in range(2, int(number ** 0.5) + 1)):
+        number -= 1
+    return number
+
+
+def result_score(result, distance, move_count):
+    """Gives the score of a solved position from its result and the number of moves
+    until the end of the game, the inverse of result_distance.
+
+    Args:
+        result (int): 1 if the player to move wins, 0 for a draw and -1 if they lose
+        distance (int): The number of moves until the game ends, see result_distance
+        move_count (int): The number of moves made in the game so far
+
+    Returns:
+        The score of the position for the player to move, see Solver
+    """
+    if result == 0:
+        return 0
+    moves_before_end = move_count + distance - 1
+    if result > 0:
+        return (CELLS + move_count % 2 - moves_before_end) // 2
+    return (moves_before_end - CELLS - (move_count + 1) % 2) // 2
+
+
+class Solver:
+    """Solves positions exactly, by searching until the end of the game.
+
+    The score of a position is for the player to move: positive if they win, negative if they
+    lose and 0 for a draw. The sooner the game is won, the larger the score: a win with the
+    player's last possible move scores 1, and each move earlier adds 1. Since the score range
+    gets narrower the fuller the board is, the search cuts off positions that cannot beat
+    the window.
+
+    The search works on plain bitboards rather than the Board, since it needs none of
+    the incremental state the Board keeps. The pieces of the player to move are stored,
+    so that the position after a move is simply (pieces ^ mask, mask | move).
+    """
+
+    def __init__(self, table_size_mb=SOLVER_TABLE_MB, tablebase=None):
+        """Class constructor
+
+        Args:
+            table_size_mb (float): Memory for the table in megabytes
+            tablebase (Tablebase): Solved positions to look up instead of searching them,
+                                   None to search every position
+        """
+        self.tablebase = tablebase
+        # Upper bounds of the scores of searched positions, keyed by pieces + mask, which is
+        # unique for every position. The table has a fixed number of slots, a prime so that
+        # the keys spread evenly, and a position replaces whatever its slot held before.
+        self.slots = _prime_below(max(2, int(table_size_mb * 2**20) // SOLVER_SLOT_BYTES))
+        self._keys = None
+        self._scores = None
+        self.nodes = 0
+        self.time_up = None
+        self.clear()
+
+    def clear(self):
+        """Empties the table.
+        """
+        self._keys = array("Q", bytes(8 * self.slots))
+        self._scores = array("B", bytes(self.slots))
+
+    def solve(self, board, player, weak=False, time_up=None):
+        """Solves the position on the board.
+
+        Args:
+            board (Board): The game board
+            player (int): The player whose turn it is
+            weak (bool): True to only find whether the position is won, drawn or lost,
+                         in which case the score is 1, 0 or -1
+            time_up (callable): Called every CHECK_INTERVAL positions, the search
+                                stops by raising SearchTimeout when it returns True
+
+        Returns:
+            score, best_move: The score of the position for the player, and a move reaching it
+
+        Raises:
+            SearchTimeout: If time_up returned True
+        """
+        self.time_up = time_up
+        pieces = board.position if player == 1 else board.mask ^ board.position
+        mask = board.mask
+        move_count = mask.bit_count()
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+
+        winning_squares = alignment_squares(pieces) & possible
+        if winning_squares:
+            return (1 if weak else _half(CELLS + 1 - move_count)), square_column(winning_squares)
+
+        if weak:
+            lower, upper = -1, 1
+        else:
+            lower, upper = -_half(CELLS - move_count), _half(CELLS + 1 - move_count)
+
+        # Narrow the score range with null window searches, trying scores closer to 0 first,
+        # since searches proving a quick win or loss are cheaper
+        while lower < upper:
+            middle = lower + _half(upper - lower)
+            if middle <= 0 and _half(lower) < middle:
+                middle = _half(lower)
+            elif middle >= 0 and _half(upper) > middle:
+                middle = _half(upper)
+            score = self._negamax(pieces, mask, move_count, middle, middle + 1)
+            if score <= middle:
+                upper = score
+            else:
+                lower = score
+        score = lower
+        if weak:
+            score = (score > 0) - (score < 0)
+
+        # Find a move reaching the score, the table makes these searches cheap
+        for move in self._ordered_moves(pieces, mask, self._non_losing_moves(pieces, mask)):
+            child_score = self._negamax(pieces ^ mask, mask | move, move_count + 1,
+                                        -score, -score + 1)
+            if -child_score >= score:
+                return score, square_column(move)
+        # Every move loses right away
+        return score, square_column(possible)
+
+    def _non_losing_moves(self, pieces, mask):
+        """Finds the moves that do not let the opponent win with their next move.
+
+        Args:
+            pieces (int): Bitboard of the pieces of the player to move
+            mask (int): Bitboard of all pieces
+
+        Returns:
+            Bitboard of the squares of the moves
+        """
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        opponent_squares = alignment_squares(pieces ^ mask) & ~mask
+        forced_squares = possible & opponent_squares
+        if forced_squares:
+            # Two threats cannot both be blocked
+            if forced_squares & (forced_squares - 1):
+                return 0
+            possible = forced_squares
+        # Never play below a square where the opponent would win
+        return possible & ~(opponent_squares >> 1)
+
+    def _ordered_moves(self, pieces, mask, moves):
+        """Orders moves by how many squares the player would win on after them,
+        most first, and equally good moves from the centre outwards.
+
+        Args:
+            pieces (int): Bitboard of the pieces of the player to move
+            mask (int): Bitboard of all pieces
+            moves (int): Bitboard of the squares of the moves
+
+        Returns:
+            List of the bitboards of the moves
+        """
+        scored = []
+        for order, column in enumerate(IDEAL_MOVE_ORDER):
+            move = moves & COLUMN_MASKS[column]
+            if move:
+                threats = (alignment_squares(pieces | move) & ~(mask | move)).bit_count()
+                scored.append((-threats, order, move))
+        scored.sort()
+        return [move for _, _, move in scored]
+
+    def _negamax(self, pieces, mask, move_count, alpha, beta):
+        """Negamax search with alpha beta pruning until the end of the game.
+        The player to move must not be able to win with their next move.
+
+        Args:
+            pieces (int): Bitboard of the pieces of the player to move
+            mask (int): Bitboard of all pieces
+            move_count (int): The number of moves made in the game so far
+            alpha, beta (int): The search window
+
+        Returns:
+            The exact score if it lies in the window, otherwise a bound beyond the window
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and self.time_up is not None and self.time_up():
+            raise SearchTimeout
+
+        moves = self._non_losing_moves(pieces, mask)
+        if not moves:
+            # The opponent wins with their next move
+            return -_half(CELLS - move_count)
+
+        # With two or fewer empty squares and no win next move for either player, it is a draw
+        if move_count >= CELLS - 2:
+            return 0
+
+        # Positions in the tablebase are solved already
+        if self.tablebase is not None and CELLS - move_count <= self.tablebase.empties:
+            solved = self.tablebase.probe(pieces, mask)
+            if solved is not None:
+                return result_score(*solved, move_count)
+
+        # The opponent cannot win with their next move, which limits the lowest score
+        lower = -_half(CELLS - 2 - move_count)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+
+        # Nor can the player to move, which limits the highest score
+        key = pieces + mask
+        slot = key % self.slots
+        upper = _half(CELLS - 1 - move_count)
+        if self._scores[slot] and self._keys[slot] == key:
+            upper = self._scores[slot] - _SCORE_OFFSET
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        opponent_pieces = pieces ^ mask
+        for move in self._ordered_moves(pieces, mask, moves):
+            score = -self._negamax(opponent_pieces, mask | move, move_count + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        self._keys[slot] = key
+        self._scores[slot] = alpha + _SCORE_OFFSET
+        return alpha
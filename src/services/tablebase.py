@@ -0,0 +1,149 @@
+"""Endgame tablebase: solved positions with few empty squares, stored in a sorted binary file"""
+import os
+from services.board import COLUMN_BITS, WIDTH
+from services.position_file import PositionFile, write_position_file
+from services.solver import CELLS, Solver, result_distance
+
+# Default location of the tablebase file, src/data/tablebase.bin
+TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "data", "tablebase.bin")
+
+# Default number of empty squares from which on positions are stored
+TABLEBASE_EMPTIES = 12
+
+MAGIC = b"C4TBASE1"
+
+# The byte of a position holds the result in its top two bits and the distance in the others
+DISTANCE_BITS = 6
+
+# The bits of each column in a key, which has one more bit per column than a piece bitboard,
+# and the distances by which the columns left of the centre and their mirrors are shifted
+_KEY_COLUMNS = [((1 << COLUMN_BITS) - 1) << (column * COLUMN_BITS) for column in range(WIDTH)]
+_MIRROR_SHIFTS = [(column, (WIDTH - 1 - 2 * column) * COLUMN_BITS) for column in range(WIDTH // 2)]
+
+
+def position_key(pieces, mask):
+    """Gives the key of a position in the tablebase. The pieces of the player to move
+    plus all pieces is unique for every position, and needs no Zobrist keys, so the solver
+    can compute it from its bitboards. Mirrored positions share the smaller key.
+
+    Args:
+        pieces (int): Bitboard of the pieces of the player to move
+        mask (int): Bitboard of all pieces
+
+    Returns:
+        The key of the position
+    """
+    key = pieces + mask
+    mirror_key = key & _KEY_COLUMNS[WIDTH // 2]
+    for column, shift in _MIRROR_SHIFTS:
+        mirror_key |= ((key & _KEY_COLUMNS[column]) << shift
+                       | (key & _KEY_COLUMNS[WIDTH - 1 - column]) >> shift)
+    return min(key, mirror_key)
+
+
+class Tablebase(PositionFile):
+    """A tablebase file, storing for each position whether the player to move wins (1),
+    draws (0) or loses (-1) with perfect play, and the number of moves until the game ends.
+    """
+
+    def __init__(self, path):
+        """Class constructor
+
+        Args:
+            path (str): Path of the tablebase file
+
+        Raises:
+            ValueError: If the file is not a tablebase file
+        """
+        super().__init__(path, MAGIC)
+        self.empties = self.limit
+        self.probes = 0  # lookups
+        self.hits = 0  # lookups finding the position
+
+    def probe(self, pieces, mask):
+        """Looks up a position in the tablebase.
+
+        Args:
+            pieces (int): Bitboard of the pieces of the player to move
+            mask (int): Bitboard of all pieces
+
+        Returns:
+            result, distance: The result for the player to move, and the number of moves
+                              until the game ends, counting the final move (see result_distance),
+                              or None if the position is not in the tablebase
+        """
+        self.probes += 1
+        value = self.find(position_key(pieces, mask))
+        if value is None:
+            return None
+        self.hits += 1
+        return (value >> DISTANCE_BITS) - 1, value & ((1 << DISTANCE_BITS) - 1)
+
+
+def load_tablebase(path=TABLEBASE_PATH):
+    """Opens the tablebase file if it exists.
+
+    Args:
+        path (str): Path of the tablebase file
+
+    Returns:
+        The Tablebase, or None if there is no tablebase file
+    """
+    if not os.path.exists(path):
+        return None
+    return Tablebase(path)
+
+
+def generate_tablebase(roots, path=TABLEBASE_PATH, empties=TABLEBASE_EMPTIES):
+    """Generates the tablebase by solving every position with at most the given number
+    of empty squares that can be reached from the root positions, and writes it to a file.
+
+    Args:
+        roots (list): Boards with the root positions, none of them a finished game
+        path (str): Path of the tablebase file
+        empties (int): Number of empty squares from which on positions are stored
+
+    Returns:
+        The number of positions in the tablebase
+    """
+    solver = Solver()
+    entries = {}
+    visited = set()
+    for board in roots:
+        _add_positions(board, solver, board.mask.bit_count(), empties, entries, visited)
+    write_position_file(path, MAGIC, empties, entries)
+    return len(entries)
+
+
+def _add_positions(board, solver, move_count, empties, entries, visited):
+    """Adds the position on the board and the positions following it to the tablebase.
+
+    Args:
+        board (Board): The game board, with the position to add
+        solver (Solver): The solver of the positions
+        move_count (int): Moves in the game so far
+        empties (int): Number of empty squares from which on positions are stored
+        entries (dict): The values of the positions found so far, keyed by position_key
+        visited (set): Keys of the positions already added
+    """
+    if move_count == CELLS:
+        return
+    turn = move_count % 2 + 1
+    pieces = board.position if turn == 1 else board.mask ^ board.position
+    key = position_key(pieces, board.mask)
+    if key in visited:
+        return
+    visited.add(key)
+
+    if CELLS - move_count <= empties:
+        score, _ = solver.solve(board, turn)
+        result = (score > 0) - (score < 0)
+        entries[key] = (result + 1) << DISTANCE_BITS | result_distance(score, move_count)
+
+    for column in range(WIDTH):
+        if board.check_valid_move(column):
+            board.make_move(column, turn)
+            if not board.check_win(column):
+                _add_positions(board, solver, move_count + 1, empties, entries, visited)
+            board.undo_move(column)
@@ -0,0 +1,104 @@
+"""Time management of the AI's searches"""
+import time
+from services.board import WIDTH, HEIGHT
+
+# Default time target of a move in seconds
+MOVE_TIME = 3
+
+# A new depth of iterative deepening is only started before this share of the move's time
+# has passed, since it usually takes longer than all the depths before it together
+NEW_DEPTH_SHARE = 0.5
+
+# At most this share of the remaining game clock is used for one move
+MAX_CLOCK_SHARE = 0.5
+
+# The search checks the time after this many positions, which is a power of two,
+# so that checking whether it is time to check is cheap
+CHECK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time for the move has run out.
+    """
+
+
+class TimeManager:
+    """Decides how long the AI may search for each move, given a time target per move,
+    and optionally a clock for the whole game with an increment added after each move.
+    """
+
+    def __init__(self, move_time=MOVE_TIME, game_time=None, increment=0):
+        """Class constructor
+
+        Args:
+            move_time (float): Target time of a move in seconds, None for no target,
+                               in which case game_time must be given
+            game_time (float): Time of the AI's clock for the whole game in seconds,
+                               None if the game is not played on a clock
+            increment (float): Seconds added to the AI's clock after each of its moves
+        """
+        self.move_time = move_time
+        self.game_time = game_time
+        self.increment = increment
+        self.remaining = game_time
+        self.start_time = None
+        self.deadline = None
+
+    def new_game(self):
+        """Resets the game clock before a new game.
+        """
+        self.remaining = self.game_time
+
+    def start_move(self, move_count):
+        """Starts the clock for a move and sets its deadline.
+
+        On a game clock, the remaining time is split between the moves the AI can
+        still make, and a move never uses more than MAX_CLOCK_SHARE of it.
+
+        Args:
+            move_count (int): Moves in the game so far
+        """
+        self.start_time = time.perf_counter()
+        budget = self.move_time
+        if self.remaining is not None:
+            moves_left = max(1, (WIDTH * HEIGHT - move_count + 1) // 2)
+            clock_budget = min(self.remaining / moves_left + self.increment,
+                               self.remaining * MAX_CLOCK_SHARE)
+            budget = clock_budget if budget is None else min(budget, clock_budget)
+        self.deadline = self.start_time + budget
+
+    def end_move(self):
+        """Stops the clock after a move, taking the time used from the game clock
+        and adding the increment.
+
+        Returns:
+            The seconds used for the move
+        """
+        elapsed = time.perf_counter() - self.start_time
+        if self.remaining is not None:
+            self.remaining = max(0, self.remaining - elapsed) + self.increment
+        self.deadline = None
+        return elapsed
+
+    def can_start_depth(self):
+        """Checks whether there is enough time left to start searching a new depth.
+
+        Returns:
+            True, if less than NEW_DEPTH_SHARE of the move's time has passed
+        """
+        now = time.perf_counter()
+        return now - self.start_time < NEW_DEPTH_SHARE * (self.deadline - self.start_time)
+
+    def time_up(self, share=1):
+        """Checks whether the deadline of the move has passed.
+
+        Args:
+            share (float): Share of the move's time to check for, for parts of a search
+
+        Returns:
+            True, if the search must stop. False, also when no move is being timed.
+        """
+        if self.deadline is None:
+            return False
+        now = time.perf_counter()
+        return now >= self.start_time + share * (self.deadline - self.start_time)
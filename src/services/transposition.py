@@ -0,0 +1,265 @@
+"""Transposition table for the AI search"""
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple
+
+# Bound types, telling how a stored value relates to the real value of the position
+EXACT = 0  # the value is the real value
+LOWER_BOUND = 1  # the search failed high, the real value is at least the value
+UPPER_BOUND = 2  # the search failed low, the real value is at most the value
+
+DEFAULT_SIZE_MB = 16
+
+# Each slot takes a 64-bit key and a 64-bit data word. The key is stored XORed with the data,
+# so that a slot whose two words were written by different processes at the same time
+# does not match any key, see SharedTranspositionTable. The data word packs:
+# bits 0-7 depth, bits 8-9 bound, bits 10-13 best move, bit 14 occupied flag,
+# bits 15-22 age (the search generation that stored the entry),
+# bits 24-55 value shifted to be non-negative.
+SLOT_BYTES = 16
+SLOTS_PER_BUCKET = 2  # a depth-preferred slot followed by an always-replace slot
+_BOUND_SHIFT = 8
+_MOVE_SHIFT = 10
+_OCCUPIED = 1 << 14
+_AGE_SHIFT = 15
+_AGES = 256
+_VALUE_SHIFT = 24
+_VALUE_OFFSET = 1 << 31
+
+
+class TableEntry(NamedTuple):
+    """A searched position stored in the transposition table.
+
+    Attributes:
+        depth (int): The remaining search depth the value was found with
+        bound (int): EXACT, LOWER_BOUND or UPPER_BOUND
+        value (int): The value found by the search
+        best_move (int): The best move found by the search
+    """
+    depth: int
+    bound: int
+    value: int
+    best_move: int
+
+
+class TranspositionTable:
+    """Fixed-size transposition table, preallocated as arrays of slots
+    so that its memory use does not grow during a search.
+
+    Positions are stored by their 64-bit key in the bucket given by the key
+    modulo the number of buckets. Each bucket has two slots: a depth-preferred
+    slot, keeping the entry searched deepest, and an always-replace slot,
+    taking the newest entry, as well as the entry pushed out of the first slot.
+
+    The table can be kept between searches. Each search has its own generation,
+    and entries from older generations are replaced first, however deep they are.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        """Class constructor
+
+        Args:
+            size_mb (float): Memory to use for the table in megabytes
+        """
+        self.buckets = max(1, int(size_mb * 2**20) // (SLOT_BYTES * SLOTS_PER_BUCKET))
+        self._keys = None
+        self._data = None
+        self.generation = 0
+        self.entries = 0
+        self.hits = 0  # lookups finding the position
+        self.misses = 0  # lookups not finding the position
+        self.collisions = 0  # misses where the bucket holds other positions
+        self.overwrites = 0  # stores replacing an entry of another position
+        self.clear()
+
+    def clear(self):
+        """Empties the table and resets its statistics.
+        """
+        empty = bytes(8 * SLOTS_PER_BUCKET * self.buckets)
+        self._keys = array("Q", empty)
+        self._data = array("Q", empty)
+        self._reset()
+
+    def _reset(self):
+        """Resets the generation and the statistics.
+        """
+        self.generation = 0
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """Starts a new generation, making the entries stored so far stale.
+        Stale entries can still be found, but are the first ones to be replaced.
+        """
+        self.generation = (self.generation + 1) % _AGES
+
+    def get(self, key):
+        """Looks up a position.
+
+        Args:
+            key (int): 64-bit key of the position
+
+        Returns:
+            TableEntry of the position, or None if it is not in the table
+        """
+        index = key % self.buckets * SLOTS_PER_BUCKET
+        keys = self._keys
+        table = self._data
+        data = table[index]
+        if keys[index] ^ data != key:
+            data = table[index + 1]
+            if keys[index + 1] ^ data != key:
+                data = 0
+
+        if not data & _OCCUPIED:
+            self.misses += 1
+            if table[index] & _OCCUPIED or table[index + 1] & _OCCUPIED:
+                self.collisions += 1
+            return None
+
+        self.hits += 1
+        return TableEntry(data & 0xFF, (data >> _BOUND_SHIFT) & 3,
+                          (data >> _VALUE_SHIFT) - _VALUE_OFFSET, (data >> _MOVE_SHIFT) & 0xF)
+
+    def store(self, key, depth, bound, value, best_move):
+        """Stores a searched position. The entry goes to the depth-preferred slot
+        of its bucket if that slot holds the same position or one searched
+        less deep or stale, and to the always-replace slot otherwise.
+
+        Args:
+            key (int): 64-bit key of the position
+            depth (int): The remaining search depth the value was found with
+            bound (int): EXACT, LOWER_BOUND or UPPER_BOUND
+            value (int): The value found by the search
+            best_move (int): The best move found by the search
+        """
+        data = (depth | bound << _BOUND_SHIFT | best_move << _MOVE_SHIFT | _OCCUPIED
+                | self.generation << _AGE_SHIFT | (value + _VALUE_OFFSET) << _VALUE_SHIFT)
+        index = key % self.buckets * SLOTS_PER_BUCKET
+        keys = self._keys
+        first = self._data[index]
+        first_key = keys[index] ^ first
+
+        if first & _OCCUPIED and first_key != key:
+            if depth < first & 0xFF and (first >> _AGE_SHIFT) & 0xFF == self.generation:
+                # Keep the deeper entry, the new one goes to the always-replace slot
+                self._write(index + 1, key, data)
+                return
+            # Push the old entry down to the always-replace slot
+            if keys[index + 1] ^ self._data[index + 1] == key:
+                keys[index + 1] = first_key ^ first
+                self._data[index + 1] = first
+            else:
+                self._write(index + 1, first_key, first)
+            keys[index] = key ^ data
+            self._data[index] = data
+            return
+        self._write(index, key, data)
+
+    def _write(self, index, key, data):
+        """Writes a slot, keeping count of the entries and the overwritten positions.
+
+        Args:
+            index (int): Index of the slot
+            key (int): Key of the entry
+            data (int): Packed data of the entry
+        """
+        old = self._data[index]
+        if not old & _OCCUPIED:
+            self.entries += 1
+        elif self._keys[index] ^ old != key:
+            self.overwrites += 1
+        self._keys[index] = key ^ data
+        self._data[index] = data
+
+    def __contains__(self, key):
+        index = key % self.buckets * SLOTS_PER_BUCKET
+        for slot in (index, index + 1):
+            data = self._data[slot]
+            if self._keys[slot] ^ data == key and data & _OCCUPIED:
+                return True
+        return False
+
+    def __iter__(self):
+        for key, data in zip(self._keys, self._data):
+            if data & _OCCUPIED:
+                yield key ^ data
+
+    def __len__(self):
+        return self.entries
+
+    def stats(self):
+        """Returns the table statistics.
+
+        Returns:
+            dict: Generation, number of entries and slots,
+                hits, misses, collisions and overwrites
+        """
+        return {"generation": self.generation, "entries": self.entries,
+                "slots": self.buckets * SLOTS_PER_BUCKET,
+                "hits": self.hits, "misses": self.misses,
+                "collisions": self.collisions, "overwrites": self.overwrites}
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table in shared memory, used by several processes searching at once,
+    see services/lazy_smp.py.
+
+    The processes read and write the table without locks. Each store writes the two words
+    of a slot one after the other, so another process can write the same slot in between.
+    Since the key is stored XORed with the data, such a mixed slot no longer matches its key
+    and is seen as empty, instead of giving the value of another position.
+
+    The statistics only count the lookups and stores of the process itself.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB, name=None):
+        """Class constructor
+
+        Args:
+            size_mb (float): Memory to use for the table in megabytes,
+                             the same in every process using the table
+            name (str): Name of the shared memory of an existing table to use,
+                        None to create a new table, owned by this process
+        """
+        buckets = max(1, int(size_mb * 2**20) // (SLOT_BYTES * SLOTS_PER_BUCKET))
+        words = SLOTS_PER_BUCKET * buckets
+        self.owner = name is None
+        if self.owner:
+            self._memory = SharedMemory(create=True, size=SLOT_BYTES * words)
+        else:
+            self._memory = SharedMemory(name=name)
+        self._words = self._memory.buf[:SLOT_BYTES * words].cast("Q")
+        self._shared_keys = self._words[:words]
+        self._shared_data = self._words[words:]
+        super().__init__(size_mb)
+
+    @property
+    def name(self):
+        """Name of the shared memory, for other processes to use the table
+        """
+        return self._memory.name
+
+    def clear(self):
+        """Empties the table if this process owns it, and resets the statistics.
+        The other processes only reset their statistics.
+        """
+        self._keys = self._shared_keys
+        self._data = self._shared_data
+        if self.owner:
+            size = len(self._words) * 8
+            self._memory.buf[:size] = bytes(size)
+        self._reset()
+
+    def close(self):
+        """Stops using the shared memory, and frees it if this process owns the table.
+        """
+        for view in (self._shared_keys, self._shared_data, self._words):
+            view.release()
+        self._keys = self._data = None
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
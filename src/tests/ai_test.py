@@ -1,8 +1,11 @@
 import unittest
 import math
+import time
 
-from services.ai import AI
-from services.board import Board
+from services.ai import AI, WINDOW_SCORES
+from services.board import Board, LINE_SQUARES, TURN_KEYS
+from services.transposition import EXACT, LOWER_BOUND, TranspositionTable
+from services.time_manager import TimeManager
 
 VERY_LARGE_NUMBER = math.inf
 VERY_SMALL_NUMBER = -math.inf
@@ -12,7 +15,8 @@ test_board = Board()
 
 class TestAI(unittest.TestCase):
     def setUp(self):
-        self.ai = AI(test_board)
+        # Limiting the depth keeps the moves found independent of the speed of the machine
+        self.ai = AI(test_board, max_depth=6)
         test_board.clear_board()
 
     def test_next_move_empty_board(self):
@@ -281,7 +285,7 @@ class TestAI(unittest.TestCase):
 
         ai_player = turn = 2
         depth = 2
-        cache = {}
+        cache = TranspositionTable(1)
         alpha = VERY_SMALL_NUMBER
         beta = VERY_LARGE_NUMBER
         prev_move = 3
@@ -290,19 +294,13 @@ class TestAI(unittest.TestCase):
         self.ai.minimax(depth, turn, alpha, beta, prev_move,
                         move_count, ai_player, cache)
 
-        state = test_board.board.copy()
-        state[4][3] = 2
-        state = tuple(map(tuple, state))
-        key = (state, turn)
+        test_board.make_move(3, 2)
+        key = test_board.canonical_key ^ TURN_KEYS[1]
 
-        check = False
-        for key in cache:
-            if key[0] == state:
-                check = True
         # because in this case, the AI should make move 3, meaning it will evaluate it
         # as part of the minimax and store evaluation in cache
 
-        self.assertEqual(check, True)
+        self.assertEqual(key in cache, True)
 
     def test_next_move_minimax_caching_depth_one(self):
         """Tests whether the correct entries are put into the cache at depth 1
@@ -315,13 +313,10 @@ class TestAI(unittest.TestCase):
 
         # Create list of board states that should be in cache
         board_states = []
-        state = test_board.board.copy()
         for col in range(7):
-            state[5][col] = 1
-            board = tuple(map(tuple, state))
-            key = (board, 2)
-            board_states.append(board)
-            state[5][col] = 0
+            test_board.make_move(col, 1)
+            board_states.append(test_board.canonical_key ^ TURN_KEYS[2])
+            test_board.undo_move(col)
 
         ai_player = 1
         depth = 1
@@ -332,7 +327,7 @@ class TestAI(unittest.TestCase):
 
         best_move = 3
 
-        cache = {}
+        cache = TranspositionTable(1)
 
         # all moves available since no prior moves
         moves = [3, 2, 4, 1, 5, 0, 6]
@@ -357,7 +352,7 @@ class TestAI(unittest.TestCase):
 
         check = True
         for key in cache:
-            if key[0] not in board_states:
+            if key not in board_states:
                 check = False
 
         self.assertEqual(check, True)
@@ -377,7 +372,7 @@ class TestAI(unittest.TestCase):
             [2, 1, 2, 1, 2, 1, 2]]
 
         score, move = self.ai.minimax(
-            4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 1, 41, 1, {})
+            4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 1, 41, 1, TranspositionTable(1))
 
         self.assertEqual(score, 0)
         self.assertEqual(move, 0)
@@ -398,10 +393,10 @@ class TestAI(unittest.TestCase):
             [1, 2, 1, 1, 2, 1, 1],
             [2, 1, 1, 1, 2, 1, 2]]
 
-        wins = [2, 5]
+        wins = [0, 2, 5]
 
         score, move = self.ai.minimax(
-            4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 1, 27, 1, {})
+            4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 1, 27, 1, TranspositionTable(1))
         found_move = move in wins
 
         self.assertEqual(score > 10000, True)
@@ -421,16 +416,17 @@ class TestAI(unittest.TestCase):
             [1, 2, 1, 1, 2, 1, 1],
             [2, 1, 1, 1, 2, 1, 2]]
 
-        loss_prevention = 2
+        # Player 1 wins with column 0 (diagonally) or column 2 (vertically)
+        loss_prevention = [0, 2]
 
         turn = 1
         ai_player = 2
 
         score, move = self.ai.minimax(
-            5, turn, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 3, 26, ai_player, {})
+            5, turn, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 3, 26, ai_player, TranspositionTable(1))
 
         self.assertEqual(score < -10000, True)
-        self.assertEqual(loss_prevention, move)
+        self.assertEqual(move in loss_prevention, True)
 
     def test_evaluate_window_favourable(self):
         """Tests whether a favourable window to the current
@@ -581,3 +577,519 @@ class TestAI(unittest.TestCase):
 
         score = self.ai.evaluate_board(ai_player, turn)
         self.assertEqual(score, expected_score)
+
+    def test_minimax_cache_entry_depth_and_bound(self):
+        """Tests that minimax stores the searched depth and an exact bound
+        for a position searched with the full alpha-beta window.
+        """
+        test_board.clear_board()
+        test_board.make_move(3, 1)
+
+        cache = TranspositionTable(1)
+        self.ai.minimax(3, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 3, 1, 2, cache)
+
+        entry = cache.get(test_board.canonical_key ^ TURN_KEYS[2])
+
+        self.assertEqual(entry.depth, 3)
+        self.assertEqual(entry.bound, EXACT)
+
+    def test_minimax_uses_cached_exact_value(self):
+        """Tests that minimax returns the stored value and move of a cache entry
+        searched at least as deep as required, without searching again.
+        """
+        test_board.clear_board()
+        test_board.make_move(3, 1)
+
+        cache = TranspositionTable(1)
+        cache.store(test_board.canonical_key ^ TURN_KEYS[2], 4, EXACT, 123, 6)
+
+        score, move = self.ai.minimax(
+            3, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 3, 1, 2, cache)
+
+        self.assertEqual((score, move), (123, 6))
+        self.assertEqual(len(cache), 1)
+
+    def test_minimax_cached_bound_narrows_window(self):
+        """Tests that a stored lower bound at or above beta cuts the search off.
+        """
+        test_board.clear_board()
+        test_board.make_move(3, 1)
+
+        cache = TranspositionTable(1)
+        cache.store(test_board.canonical_key ^ TURN_KEYS[2], 4, LOWER_BOUND, 500, 2)
+
+        score, move = self.ai.minimax(3, 2, -100, 100, 3, 1, 2, cache)
+
+        self.assertEqual((score, move), (500, 2))
+
+    def test_next_move_keeps_table(self):
+        """Tests that the transposition table is kept between moves,
+        so that the next search finds positions searched for the previous move.
+        """
+        test_board.clear_board()
+        test_board.make_move(3, 1)
+
+        self.ai.next_move(2, 1)
+        test_board.make_move(3, 2)
+        test_board.make_move(2, 1)
+        key = test_board.canonical_key ^ TURN_KEYS[2]
+        searched_before = key in self.ai.table
+
+        self.ai.next_move(2, 3)
+
+        self.assertEqual(searched_before, True)
+        self.assertEqual(self.ai.table.generation, 2)
+
+    def test_new_game_clears_table(self):
+        """Tests that starting a new game empties the transposition table.
+        """
+        test_board.clear_board()
+        self.ai.next_move(1, 0)
+
+        self.ai.new_game()
+
+        self.assertEqual(len(self.ai.table), 0)
+
+    def test_minimax_cache_mirrored_position(self):
+        """Tests that a cached best move is mirrored when the entry is found
+        for the mirror image of the stored position.
+        """
+        test_board.clear_board()
+        test_board.make_move(0, 1)
+        cache = TranspositionTable(1)
+        self.ai.minimax(2, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 0, 1, 2, cache)
+        _, move = self.ai.minimax(2, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 0, 1, 2, cache)
+
+        test_board.clear_board()
+        test_board.make_move(6, 1)
+        _, mirrored_move = self.ai.minimax(
+            2, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 6, 1, 2, cache)
+
+        self.assertEqual(mirrored_move, 6 - move)
+
+    def test_evaluate_board_sum_of_windows(self):
+        """Tests that the board evaluation equals the sum of the window evaluations
+        of all lines of four on the board.
+        """
+        test_board.clear_board()
+
+        test_board.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 1, 2, 0, 0, 0],
+            [0, 0, 2, 1, 1, 0, 0],
+            [0, 1, 2, 2, 1, 0, 0],
+            [2, 1, 1, 2, 2, 0, 1]]
+
+        turn = 2
+        expected_score = 0
+        for squares in LINE_SQUARES:
+            window = [test_board.board[row][col] for row, col in squares]
+            expected_score += self.ai._evaluate_window(window, turn)
+
+        self.assertEqual(self.ai.evaluate_board(2, turn), expected_score)
+        self.assertEqual(self.ai.evaluate_board(1, turn), -expected_score)
+
+    def test_window_scores_table(self):
+        """Tests that the window score table gives the same scores for both players
+        with the pieces swapped, and no score for windows with pieces of both players.
+        """
+        for player_one in range(5):
+            for player_two in range(5 - player_one):
+                self.assertEqual(WINDOW_SCORES[1][player_one * 5 + player_two],
+                                 WINDOW_SCORES[2][player_two * 5 + player_one])
+        self.assertEqual(WINDOW_SCORES[1][3 * 5 + 0], 100)
+        self.assertEqual(WINDOW_SCORES[2][3 * 5 + 0], -100)
+        self.assertEqual(WINDOW_SCORES[1][2 * 5 + 1], 0)
+
+    def test_evaluate_board_incremental_matches_full(self):
+        """Tests that the incrementally kept evaluation equals the evaluation
+        of the whole board after every move and undo of a game.
+        """
+        test_board.clear_board()
+
+        moves = [3, 3, 2, 4, 4, 2, 5, 1, 1, 6, 0, 3, 3, 2, 5, 5]
+        player = 1
+        for move in moves:
+            test_board.make_move(move, player)
+            player = 3 - player
+            for ai_player in (1, 2):
+                self.assertEqual(self.ai.evaluate_board(ai_player, player),
+                                 self.ai.evaluate_board_full(ai_player, player))
+
+        for _ in moves:
+            test_board.undo_move()
+            self.assertEqual(self.ai.evaluate_board(1, 1),
+                             self.ai.evaluate_board_full(1, 1))
+        self.assertEqual(self.ai.evaluate_board(1, 1), 0)
+
+    def test_negamax_value_for_player_to_move(self):
+        """Tests that negamax scores the position for the player whose turn it is,
+        so that it is the negated minimax value of the opponent.
+        """
+        test_board.clear_board()
+
+        test_board.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 1, 0, 0, 0, 0, 0],
+            [1, 1, 0, 0, 2, 0, 2],
+            [2, 2, 1, 2, 1, 0, 1],
+            [1, 2, 1, 1, 2, 1, 1],
+            [2, 1, 1, 1, 2, 1, 2]]
+
+        score, move = self.ai.negamax(
+            4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 3, 26, TranspositionTable(1))
+        minimax_score, _ = self.ai.minimax(
+            4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 3, 26, 2, TranspositionTable(1))
+
+        self.assertEqual(score > 10000, True)
+        self.assertEqual(move in [0, 2], True)
+        self.assertEqual(minimax_score, -score)
+
+    def test_negamax_null_window(self):
+        """Tests that a null window search tells correctly whether the value
+        of the position is above or below the window, as the principal variation
+        search relies on.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (4, 2), (2, 1)):
+            test_board.make_move(move, player)
+
+        value, _ = self.ai.negamax(
+            4, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 2, 5, TranspositionTable(1))
+
+        for alpha in (value - 50, value - 1, value, value + 30):
+            bound, _ = self.ai.negamax(4, 2, alpha, alpha + 1, 2, 5, TranspositionTable(1))
+            self.assertEqual(bound > alpha, value > alpha)
+
+    def test_order_moves_without_history(self):
+        """Tests that without killer moves or history scores the moves are
+        ordered in the ideal order, with the given first move at the front.
+        """
+        test_board.clear_board()
+
+        self.assertEqual(self.ai._order_moves(1, 0), [3, 2, 4, 1, 5, 0, 6])
+        self.assertEqual(self.ai._order_moves(1, 0, 5), [5, 3, 2, 4, 1, 0, 6])
+
+    def test_order_moves_killers_and_history(self):
+        """Tests that killer moves of the ply come right after the first move,
+        and the other moves are ordered by the history scores of their squares.
+        """
+        test_board.clear_board()
+        self.ai._update_move_ordering(1, 0, 6, 2)
+        self.ai._update_move_ordering(1, 0, 0, 3)
+        self.ai._update_move_ordering(1, 4, 1, 1)
+
+        self.assertEqual(self.ai.killers[0], [0, 6])
+        self.assertEqual(self.ai._order_moves(1, 0, 3), [3, 0, 6, 1, 2, 4, 5])
+        # History scores are kept per player
+        self.assertEqual(self.ai._order_moves(2, 1), [3, 2, 4, 1, 5, 0, 6])
+
+    def test_negamax_beta_cutoff_updates_move_ordering(self):
+        """Tests that searching a position records killer moves and history scores,
+        and that a new game resets them.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (4, 2)):
+            test_board.make_move(move, player)
+
+        self.ai.negamax(4, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 4, 4, TranspositionTable(1))
+
+        self.assertEqual(any(killers[0] is not None for killers in self.ai.killers), True)
+        self.assertEqual(any(self.ai.history_scores[1] + self.ai.history_scores[2]), True)
+
+        self.ai.new_game()
+
+        self.assertEqual(all(killers == [None, None] for killers in self.ai.killers), True)
+        self.assertEqual(any(self.ai.history_scores[1] + self.ai.history_scores[2]), False)
+
+    def test_generate_moves_immediate_win(self):
+        """Tests that a move winning right away is the only move generated,
+        and that blocking is forced when the opponent has a single threat.
+        """
+        test_board.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [2, 2, 0, 2, 1, 0, 0],
+            [1, 1, 0, 1, 1, 2, 2]]
+
+        self.assertEqual(self.ai.generate_moves(1, 11), [2])
+        self.assertEqual(self.ai.generate_moves(2, 11), [2])
+
+    def test_generate_moves_two_threats(self):
+        """Tests that no moves are generated when the opponent has two threats,
+        and that negamax then scores the position as lost.
+        """
+        test_board.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1, 0, 0],
+            [2, 2, 0, 2, 1, 0, 0],
+            [1, 1, 0, 1, 1, 2, 2]]
+
+        self.assertEqual(self.ai.generate_moves(2, 12), [])
+
+        value, _ = self.ai.negamax(
+            3, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 4, 12, TranspositionTable(1))
+
+        self.assertEqual(value < -10000, True)
+
+    def test_generate_moves_skips_move_below_threat(self):
+        """Tests that a move directly below a square where the opponent would win
+        is not generated, and the other moves keep their order.
+        """
+        test_board.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [2, 2, 0, 2, 0, 0, 0],
+            [1, 1, 0, 2, 1, 2, 1]]
+
+        self.assertEqual(self.ai.generate_moves(1, 9), [3, 4, 1, 5, 0, 6])
+
+    def test_search_root_fails_outside_window(self):
+        """Tests that the root search reports a score above the window as a lower bound
+        with the move that exceeded it, and a score below the window without a move.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (4, 2)):
+            test_board.make_move(move, player)
+        moves = self.ai.get_possible_moves()
+
+        value, best_move, _ = self.ai._search_root(
+            4, 1, 4, moves, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER)
+        high_value, high_move, _ = self.ai._search_root(
+            4, 1, 4, moves, value - 40, value - 20)
+        low_value, low_move, _ = self.ai._search_root(
+            4, 1, 4, moves, value + 20, value + 40)
+
+        self.assertEqual(high_value >= value - 20, True)
+        self.assertEqual(high_move is not None, True)
+        self.assertEqual(low_value <= value + 20, True)
+        self.assertEqual(low_move, None)
+
+    def test_next_move_same_with_aspiration_window(self):
+        """Tests that searching with aspiration windows chooses the same moves
+        as searching with full windows.
+        """
+        test_board.clear_board()
+        full_window_ai = AI(test_board, aspiration_window=0, max_depth=6)
+
+        for move_count, move in enumerate((3, 3, 2, 4, 4)):
+            player = move_count % 2 + 1
+            self.assertEqual(self.ai.next_move(player, move_count),
+                             full_window_ai.next_move(player, move_count))
+            test_board.make_move(move, player)
+
+    def test_mtdf_value_matches_negamax(self):
+        """Tests that MTD(f) finds the same value as a full window search,
+        whether the first guess is below or above it. Late move reductions depend
+        on the window, so they are turned off.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (4, 2), (2, 1)):
+            test_board.make_move(move, player)
+
+        full_window_ai = AI(test_board, lmr_moves=None)
+        value, _ = full_window_ai.negamax(
+            5, 2, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 2, 5, TranspositionTable(1))
+
+        for first_guess in (value - 100, value + 100):
+            mtdf_ai = AI(test_board, lmr_moves=None)
+            mtdf_value, move = mtdf_ai.mtdf(5, 2, 5, first_guess)
+            self.assertEqual(mtdf_value, value)
+            self.assertEqual(test_board.check_valid_move(move), True)
+
+    def test_next_move_mtdf_win(self):
+        """Tests that the MTD(f) search driver finds the centre column on an empty board
+        and a winning move when there is one.
+        """
+        test_board.clear_board()
+
+        self.assertEqual(self.ai.next_move_mtdf(1, 0), 3)
+
+        for move, player in ((3, 1), (4, 2), (3, 1), (4, 2), (3, 1), (5, 2)):
+            test_board.make_move(move, player)
+
+        self.assertEqual(self.ai.next_move_mtdf(1, 6), 3)
+
+    def test_next_move_mtdf_completed_depth(self):
+        """Tests that the MTD(f) search driver records the depth it completed,
+        and starts iterative deepening from the AI's start_depth.
+        """
+        test_board.clear_board()
+
+        self.ai.next_move_mtdf(1, 0)
+        self.assertEqual(self.ai.completed_depth, 6)
+
+        ai = AI(test_board, max_depth=4, start_depth=4)
+        searched = []
+        original_mtdf = ai.mtdf
+
+        def mtdf(depth, turn, move_count, first_guess):
+            searched.append(depth - 1)
+            return original_mtdf(depth, turn, move_count, first_guess)
+
+        ai.mtdf = mtdf
+        ai.next_move_mtdf(1, 0)
+
+        self.assertEqual(searched, [4])
+        self.assertEqual(ai.completed_depth, 4)
+
+    def test_forced_move(self):
+        """Tests that moves without a choice are found without searching:
+        the only legal move, an immediate win and a forced block.
+        """
+        test_board.clear_board()
+
+        self.assertEqual(self.ai._forced_move(1, 0), None)
+
+        test_board.board = [
+            [0, 2, 2, 1, 2, 1, 2],
+            [0, 1, 2, 1, 2, 2, 1],
+            [1, 1, 1, 2, 1, 1, 2],
+            [1, 2, 2, 1, 1, 2, 2],
+            [2, 1, 2, 2, 2, 1, 1],
+            [2, 1, 2, 1, 1, 1, 2]]
+
+        self.assertEqual(self.ai._forced_move(1, 40), 0)
+        self.assertEqual(self.ai.next_move(1, 40), 0)
+
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (2, 2), (4, 1)):
+            test_board.make_move(move, player)
+
+        self.assertEqual(self.ai._forced_move(2, 5), None)
+
+        test_board.make_move(5, 2)
+
+        self.assertEqual(self.ai._forced_move(1, 6), 1)
+
+    def test_next_move_stops_at_proven_win(self):
+        """Tests that iterative deepening stops once a win is proven,
+        so a higher depth limit does not search more.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (2, 2)):
+            test_board.make_move(move, player)
+        counts = []
+
+        for max_depth in (4, 10):
+            ai = AI(test_board)
+            count = [0]
+            negamax = ai.negamax
+
+            def counting_negamax(*args):
+                count[0] += 1
+                return negamax(*args)
+
+            ai.negamax = counting_negamax
+            move = ai.next_move(1, 4, max_depth)
+            counts.append(count[0])
+
+            self.assertEqual(move in (1, 4), True)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_next_move_stops_in_time(self):
+        """Tests that a search without a depth limit stops at the deadline in the middle
+        of a depth, leaving the board as it was.
+        """
+        class EveryDepthTimeManager(TimeManager):
+            def can_start_depth(self):
+                return True
+
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (4, 2)):
+            test_board.make_move(move, player)
+        key, history = test_board.key, list(test_board.history)
+        ai = AI(test_board, time_manager=EveryDepthTimeManager(move_time=0.1))
+
+        start_time = time.perf_counter()
+        move = ai.next_move(1, 4)
+        elapsed = time.perf_counter() - start_time
+
+        self.assertEqual(0.1 <= elapsed < 0.5, True)
+        self.assertEqual(test_board.key, key)
+        self.assertEqual(test_board.history, history)
+        self.assertEqual(test_board.check_valid_move(move), True)
+
+    def test_late_move_reductions_search_fewer_positions(self):
+        """Tests that late move reductions search fewer positions than searching
+        every move to the full depth, fewer still with a larger reduction,
+        and still find a forced win.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (4, 2), (2, 1), (1, 2)):
+            test_board.make_move(move, player)
+        nodes = []
+
+        for lmr_moves, lmr_reduction in ((None, 1), (3, 1), (3, 2)):
+            ai = AI(test_board, max_depth=7, lmr_moves=lmr_moves, lmr_reduction=lmr_reduction)
+            ai.negamax(8, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 1, 6, ai.table)
+            nodes.append(ai.nodes)
+
+        self.assertEqual(nodes[2] < nodes[1] < nodes[0], True)
+
+        test_board.clear_board()
+        for move, player in ((3, 1), (3, 2), (2, 1), (2, 2)):
+            test_board.make_move(move, player)
+        ai = AI(test_board, lmr_moves=1, lmr_depth=1)
+
+        value, move = ai.negamax(6, 1, VERY_SMALL_NUMBER, VERY_LARGE_NUMBER, 2, 4, ai.table)
+
+        self.assertEqual(value > 10000, True)
+        self.assertEqual(move in (1, 4), True)
+
+    def test_solve_endgame(self):
+        """Tests that the AI solves positions with few empty squares exactly,
+        giving the best move and the number of moves until the end of the game,
+        and that positions with more empty squares are left to the heuristic search.
+        """
+        test_board.board = [
+            [0, 0, 1, 0, 1, 1, 0],
+            [0, 2, 2, 0, 1, 2, 0],
+            [0, 2, 2, 0, 1, 2, 1],
+            [0, 1, 1, 0, 2, 1, 2],
+            [1, 2, 2, 0, 1, 1, 2],
+            [2, 2, 1, 2, 2, 1, 1]]
+
+        self.assertEqual(self.ai.solve(1, 30), (0, 4, 5))
+        self.assertEqual(self.ai.next_move(1, 30), 0)
+        self.assertEqual(AI(test_board, solver_threshold=11)._solve_endgame(1, 30), None)
+
+    def test_forced_move_updates_game_clock(self):
+        """Tests that moves made without a search, such as a forced block,
+        are timed on the game clock and get its increment.
+        """
+        test_board.clear_board()
+        for move, player in ((3, 1), (2, 2), (4, 1), (2, 2), (5, 1)):
+            test_board.make_move(move, player)
+
+        for next_move in ("next_move", "next_move_mtdf"):
+            time_manager = TimeManager(game_time=10, increment=2)
+            ai = AI(test_board, time_manager=time_manager)
+
+            self.assertEqual(getattr(ai, next_move)(2, 5), 6)
+            self.assertEqual(11.9 < time_manager.remaining <= 12, True)
+            self.assertEqual(time_manager.deadline, None)
+
+    def test_search_after_solver_timeout(self):
+        """Tests that when the solver runs out of time, the heuristic search still
+        completes at least one depth to choose the move.
+        """
+        test_board.clear_board()
+        moves = [2, 2, 4, 1, 2, 1, 6, 3, 3, 2, 0, 6, 6, 0, 5, 6, 1, 1, 3, 0, 1, 5]
+        for move_count, move in enumerate(moves):
+            test_board.make_move(move, move_count % 2 + 1)
+        ai = AI(test_board, time_manager=TimeManager(move_time=0.000001))
+
+        move = ai.next_move(1, len(moves))
+
+        self.assertEqual(ai.completed_depth >= 1, True)
+        self.assertEqual(ai.nodes > 0, True)
+        self.assertEqual(test_board.check_valid_move(move), True)
@@ -0,0 +1,54 @@
+import random
+import unittest
+
+from services.ai import AI
+from services.board import Board
+
+try:
+    from services.batch_evaluation import evaluate_boards, stack_boards
+except ImportError:  # Installed without the dev dependencies, which include NumPy
+    evaluate_boards = stack_boards = None
+
+
+@unittest.skipIf(evaluate_boards is None, "NumPy is needed for batch evaluation")
+class TestBatchEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.board = Board()
+        self.ai = AI(self.board, 1)
+
+    def test_stack_boards_shape(self):
+        """Tests that boards are stacked into an (N, 6, 7) array.
+        """
+        boards = stack_boards([Board(), Board(), Board()])
+
+        self.assertEqual(boards.shape, (3, 6, 7))
+
+    def test_evaluate_boards_same_as_evaluate_board(self):
+        """Tests that the batch evaluation gives the same scores as evaluate_board
+        for positions of random games, for both players.
+        """
+        rng = random.Random(3)
+        grids = []
+        expected_scores = {1: [], 2: []}
+        for _ in range(50):
+            self.board.clear_board()
+            player = 1
+            for _ in range(rng.randint(0, 30)):
+                self.board.make_move(rng.choice(self.ai.get_possible_moves()), player)
+                player = 3 - player
+            grids.append(self.board.board)
+            for ai_player in (1, 2):
+                expected_scores[ai_player].append(self.ai.evaluate_board(ai_player, player))
+
+        boards = stack_boards(grids)
+
+        for ai_player in (1, 2):
+            scores = evaluate_boards(boards, ai_player, 1)
+            self.assertEqual(scores.tolist(), expected_scores[ai_player])
+
+    def test_evaluate_boards_empty_board(self):
+        """Tests that empty boards score 0.
+        """
+        scores = evaluate_boards(stack_boards([Board()]), 1, 2)
+
+        self.assertEqual(scores.tolist(), [0])
@@ -1,6 +1,7 @@
 import unittest
 
-from services.board import Board
+from services.board import (Board, CELL_BITS, CELL_LINES, FULL_LINE_SQUARES, LINES,
+                            LINE_SQUARES, square_column)
 
 
 """Setting constants for board size"""
@@ -638,3 +639,253 @@ class TestBoard(unittest.TestCase):
 
         win = self.testboard.check_four_connected()
         self.assertEqual(win, False)
+
+    def test_make_move_sets_bitboards(self):
+        """Tests that make_move sets the bits of the move in the bitboards
+        and increases the height of the column.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.make_move(3, 1)
+        self.testboard.make_move(3, 2)
+
+        self.assertEqual(self.testboard.position, CELL_BITS[5][3])
+        self.assertEqual(self.testboard.mask, CELL_BITS[5][3] | CELL_BITS[4][3])
+        self.assertEqual(self.testboard.heights, [0, 0, 0, 2, 0, 0, 0])
+
+    def test_undo_move_restores_bitboards(self):
+        """Tests that undoing a move restores the bitboards and column heights.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.make_move(2, 2)
+        position, mask = self.testboard.position, self.testboard.mask
+
+        self.testboard.make_move(2, 1)
+        self.testboard.undo_move(2)
+
+        self.assertEqual(self.testboard.position, position)
+        self.assertEqual(self.testboard.mask, mask)
+        self.assertEqual(self.testboard.heights, [0, 0, 1, 0, 0, 0, 0])
+
+    def test_grid_view_assignment_updates_bitboards(self):
+        """Tests that assigning a square through the grid view changes the board,
+        so that moves made afterwards land on top of it.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.board[5][4] = 2
+        self.testboard.make_move(4, 1)
+
+        self.assertEqual(self.testboard._check_square_content(5, 4), 2)
+        self.assertEqual(self.testboard._check_square_content(4, 4), 1)
+
+    def test_board_setter_column_heights(self):
+        """Tests that setting the whole grid computes the column heights.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 2],
+            [0, 0, 0, 0, 0, 0, 1],
+            [0, 0, 0, 1, 0, 0, 2],
+            [0, 0, 0, 2, 0, 0, 1],
+            [0, 0, 1, 1, 0, 0, 2]]
+
+        self.assertEqual(self.testboard.heights, [0, 0, 1, 3, 0, 0, 5])
+
+    def test_check_win_last_move(self):
+        """Tests that check_win finds the four connected completed by the last move.
+        """
+        self.testboard.clear_board()
+
+        for col in range(3):
+            self.testboard.make_move(col, 1)
+            self.testboard.make_move(col, 2)
+        self.testboard.make_move(3, 1)
+
+        self.assertEqual(self.testboard.check_win(), True)
+
+    def test_check_win_only_lines_through_square(self):
+        """Tests that check_win ignores four connected that do not pass
+        through the given square.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 1],
+            [2, 2, 2, 2, 1, 1, 1]]
+
+        self.assertEqual(self.testboard.check_win(6), False)
+        self.assertEqual(self.testboard.check_win(1), True)
+        self.assertEqual(self.testboard.check_win(6, 5), False)
+
+    def test_check_win_empty_square(self):
+        """Tests that check_win returns False for an empty column or square.
+        """
+        self.testboard.clear_board()
+
+        self.assertEqual(self.testboard.check_win(3), False)
+        self.assertEqual(self.testboard.check_win(3, 5), False)
+        self.assertEqual(self.testboard.check_win(), False)
+
+    def test_undo_move_without_column(self):
+        """Tests that undo_move without a column undoes the moves in reverse order.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.make_move(1, 1)
+        self.testboard.make_move(4, 2)
+
+        self.assertEqual(self.testboard.undo_move(), 4)
+        self.assertEqual(self.testboard.undo_move(), 1)
+        self.assertEqual(self.testboard.undo_move(), None)
+        self.assertEqual(self.testboard.mask, 0)
+
+    def test_move_history(self):
+        """Tests that the move history follows made and undone moves.
+        """
+        self.testboard.clear_board()
+
+        self.testboard.make_move(3, 1)
+        self.testboard.make_move(2, 2)
+        self.testboard.make_move(3, 1)
+        self.testboard.undo_move(3)
+
+        self.assertEqual(self.testboard.history, [3, 2])
+        self.assertEqual(self.testboard.last_move, 2)
+
+    def test_key_transposition(self):
+        """Tests that the same position reached by different move orders
+        has the same Zobrist hash, and that undoing moves restores the hash.
+        """
+        self.testboard.clear_board()
+        self.testboard.make_move(2, 1)
+        self.testboard.make_move(3, 2)
+        self.testboard.make_move(4, 1)
+        key = self.testboard.key
+
+        other_board = Board()
+        other_board.make_move(4, 1)
+        other_board.make_move(3, 2)
+        other_board.make_move(2, 1)
+
+        self.assertEqual(other_board.key, key)
+
+        for _ in range(3):
+            self.testboard.undo_move()
+        self.assertEqual(self.testboard.key, 0)
+
+    def test_key_grid_assignment(self):
+        """Tests that setting the board through the grid gives the same hash
+        as making the moves.
+        """
+        self.testboard.clear_board()
+        self.testboard.make_move(0, 2)
+        self.testboard.make_move(0, 1)
+        key = self.testboard.key
+
+        other_board = Board()
+        other_board.board[5][0] = 2
+        other_board.board[4][0] = 1
+
+        self.assertEqual(other_board.key, key)
+
+    def test_mirror_key(self):
+        """Tests that the mirror key is the key of the position mirrored left to right,
+        and that a position and its mirror image share the canonical key.
+        """
+        self.testboard.clear_board()
+        self.testboard.make_move(0, 1)
+        self.testboard.make_move(2, 2)
+        self.testboard.make_move(0, 1)
+
+        mirrored_board = Board()
+        mirrored_board.make_move(6, 1)
+        mirrored_board.make_move(4, 2)
+        mirrored_board.make_move(6, 1)
+
+        self.assertEqual(self.testboard.mirror_key, mirrored_board.key)
+        self.assertEqual(mirrored_board.mirror_key, self.testboard.key)
+        self.assertEqual(self.testboard.canonical_key, mirrored_board.canonical_key)
+
+        self.testboard.undo_move()
+        mirrored_board.undo_move()
+        self.assertEqual(self.testboard.mirror_key, mirrored_board.key)
+
+    def test_lines_table(self):
+        """Tests that the precomputed tables hold all 69 lines of four,
+        and the right number of lines through corner and centre squares.
+        """
+        self.assertEqual(len(LINES), 69)
+        self.assertEqual(len(set(LINES)), 69)
+        self.assertEqual(len(CELL_LINES[0][0]), 3)
+        self.assertEqual(len(CELL_LINES[3][3]), 13)
+        for line, squares in zip(LINES, LINE_SQUARES):
+            self.assertEqual(line.bit_count(), 4)
+            for row, col in squares:
+                self.assertEqual(line in CELL_LINES[row][col], True)
+
+    def test_heuristic_score_grid_assignment(self):
+        """Tests that setting the board through the grid gives the same window codes
+        and heuristic score as making the moves.
+        """
+        self.testboard.clear_board()
+        for move, player in ((3, 1), (3, 2), (4, 1), (2, 2), (5, 1)):
+            self.testboard.make_move(move, player)
+
+        other_board = Board()
+        other_board.board = self.testboard.board
+
+        self.assertEqual(other_board.line_codes, self.testboard.line_codes)
+        self.assertEqual(other_board.heuristic_score, self.testboard.heuristic_score)
+
+    def test_full_lines_cover_all_lines(self):
+        """Tests that every line of four lies in exactly one full row, column or diagonal.
+        """
+        self.assertEqual(len(FULL_LINE_SQUARES), 25)
+        for squares in LINE_SQUARES:
+            containing = [full_line for full_line in FULL_LINE_SQUARES
+                          if set(squares) <= set(full_line)]
+            self.assertEqual(len(containing), 1)
+
+    def test_possible_squares(self):
+        """Tests that the possible squares are the lowest empty square of each non-full column.
+        """
+        self.testboard.clear_board()
+        for move in range(6):
+            self.testboard.make_move(0, move % 2 + 1)
+        self.testboard.make_move(3, 1)
+
+        possible = self.testboard.possible_squares()
+
+        self.assertEqual(possible.bit_count(), 6)
+        self.assertEqual(possible & CELL_BITS[4][3] != 0, True)
+        self.assertEqual(possible & CELL_BITS[5][1] != 0, True)
+        self.assertEqual(square_column(possible), 1)
+
+    def test_winning_squares(self):
+        """Tests that the winning squares include open ends and gaps of lines of three,
+        whether they can be played yet or not, but no occupied squares.
+        """
+        self.testboard.board = [
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1, 0, 0],
+            [2, 2, 0, 2, 1, 0, 0],
+            [1, 1, 0, 1, 1, 2, 2]]
+
+        # The gap in the bottom row and the top of column 4 for player 1,
+        # and the gap in the second row, which cannot be played yet, for player 2
+        self.assertEqual(self.testboard.winning_squares(1), CELL_BITS[5][2] | CELL_BITS[2][4])
+        self.assertEqual(self.testboard.winning_squares(2), CELL_BITS[4][2])
+
+        self.testboard.make_move(2, 2)
+
+        self.assertEqual(self.testboard.winning_squares(1), CELL_BITS[2][4])
@@ -0,0 +1,33 @@
+import unittest
+
+from services.evaluation import LINE_SCORES, WINDOW_SCORES, window_score
+
+
+class TestEvaluation(unittest.TestCase):
+    def test_window_score(self):
+        """Tests the scores of windows with three and two pieces of one player.
+        """
+        self.assertEqual(window_score(3, 0), 100)
+        self.assertEqual(window_score(0, 2), -10)
+        self.assertEqual(window_score(2, 1), 0)
+        self.assertEqual(window_score(4, 0), 0)
+
+    def test_line_score_row(self):
+        """Tests the score of a full row holding three pieces of player 1
+        on the left and one piece of player 2 on the right.
+        """
+        code = 1 + 1 * 3 + 1 * 3**2 + 2 * 3**6
+
+        # Windows: [1, 1, 1, 0] 100, [1, 1, 0, 0] 10, [1, 0, 0, 0] 0, [0, 0, 0, 2] 0
+        self.assertEqual(LINE_SCORES[7][code], 110)
+
+    def test_line_scores_sum_of_windows(self):
+        """Tests that every line score is the sum of the scores of its windows.
+        """
+        for code in range(3**6):
+            squares = [code // 3**i % 3 for i in range(6)]
+            expected_score = 0
+            for start in range(3):
+                window = squares[start:start + 4]
+                expected_score += WINDOW_SCORES[1][window.count(1) * 5 + window.count(2)]
+            self.assertEqual(LINE_SCORES[6][code], expected_score)
@@ -0,0 +1,42 @@
+import unittest
+
+from services.board import Board
+from services.lazy_smp import LazySMP
+
+
+class TestLazySMP(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.board = Board()
+        cls.smp = LazySMP(cls.board, workers=2, max_depth=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.smp.close()
+
+    def setUp(self):
+        self.smp.new_game()
+        self.board.clear_board()
+
+    def test_next_move_completes_depth(self):
+        """Tests that the parallel search completes the depth limit, counts the nodes
+        of both processes and leaves the board as it was.
+        """
+        for move, player in ((3, 1), (3, 2), (2, 1)):
+            self.board.make_move(move, player)
+        grid = self.board.board
+
+        move = self.smp.next_move(2, 3)
+
+        self.assertEqual(self.board.check_valid_move(move), True)
+        self.assertEqual(self.smp.completed_depth, 5)
+        self.assertEqual(self.smp.nodes > self.smp.ai.nodes, True)
+        self.assertEqual(self.board.board, grid)
+
+    def test_next_move_blocks_threat(self):
+        """Tests that the parallel search blocks the opponent's threat of three in a row.
+        """
+        for move, player in ((1, 1), (0, 2), (2, 1), (6, 2), (3, 1)):
+            self.board.make_move(move, player)
+
+        self.assertEqual(self.smp.next_move(2, 5), 4)
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from services.ai import AI
+from services.board import Board
+from services.opening_book import MAGIC, OpeningBook, generate_book, load_book
+from services.position_file import write_position_file
+
+
+class TestOpeningBook(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "book.bin")
+        cls.count = generate_book(cls.path, plies=3, depth=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.board = Board()
+        self.book = OpeningBook(self.path)
+
+    def tearDown(self):
+        self.book.close()
+
+    def test_book_has_all_positions(self):
+        """Tests that the book holds the first position for player 1,
+        and for player 2 every position after player 1's first move.
+        """
+        self.assertEqual(len(self.book), self.count)
+        self.assertEqual(self.book.lookup(self.board) is not None, True)
+        for column in range(7):
+            self.board.make_move(column, 1)
+            self.assertEqual(self.book.lookup(self.board) is not None, True)
+            self.board.undo_move(column)
+
+    def test_book_move_is_search_move(self):
+        """Tests that the book move is the move the AI finds by searching.
+        """
+        self.board.make_move(1, 1)
+        ai = AI(self.board, max_depth=4)
+
+        self.assertEqual(self.book.lookup(self.board), ai.next_move(2, 1))
+
+    def test_mirrored_position(self):
+        """Tests that a position and its mirror image get mirrored book moves.
+        """
+        self.board.make_move(1, 1)
+        move = self.book.lookup(self.board)
+        mirror_board = Board()
+        mirror_board.make_move(5, 1)
+
+        self.assertEqual(self.book.lookup(mirror_board), 6 - move)
+
+    def test_position_not_in_book(self):
+        """Tests that positions beyond the book's moves are not found.
+        """
+        for move, player in ((3, 1), (3, 2), (3, 1), (3, 2)):
+            self.board.make_move(move, player)
+
+        self.assertEqual(self.book.lookup(self.board), None)
+
+    def test_ai_makes_book_move(self):
+        """Tests that the AI makes the book move without searching.
+        """
+        write_position_file(os.path.join(self.directory.name, "single.bin"), MAGIC, 1,
+                            {self.board.key: 0})
+        book = load_book(os.path.join(self.directory.name, "single.bin"))
+        ai = AI(self.board, opening_book=book)
+
+        self.assertEqual(ai.next_move(1, 0), 0)
+        self.assertEqual(ai.nodes, 0)
+        book.close()
+
+    def test_load_book(self):
+        """Tests that a missing book file gives no book, and that other files are rejected.
+        """
+        self.assertEqual(load_book(os.path.join(self.directory.name, "missing.bin")), None)
+
+        path = os.path.join(self.directory.name, "other.bin")
+        with open(path, "wb") as other_file:
+            other_file.write(b"not a book file")
+        with self.assertRaises(ValueError):
+            OpeningBook(path)
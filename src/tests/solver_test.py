@@ -0,0 +1,74 @@
+import unittest
+
+from services.board import Board
+from services.solver import Solver, result_distance, result_score
+from services.time_manager import SearchTimeout
+
+
+class TestSolver(unittest.TestCase):
+    def setUp(self):
+        self.board = Board()
+        self.solver = Solver()
+
+    def test_result_distance(self):
+        """Tests the number of moves until the end of the game for scores of wins,
+        losses and draws.
+        """
+        # Player to move wins with the winning move as the 42nd move
+        self.assertEqual(result_distance(1, 37), 5)
+        # Player to move wins right away
+        self.assertEqual(result_distance((43 - 10) // 2, 10), 1)
+        # Opponent wins with their next move
+        self.assertEqual(result_distance(-((42 - 10) // 2), 10), 2)
+        self.assertEqual(result_distance(0, 30), 12)
+
+    def test_result_score(self):
+        """Tests that the score of a position is found back from its result and distance.
+        """
+        for move_count in range(10, 42):
+            for score in range(-((42 - move_count) // 2), (43 - move_count) // 2 + 1):
+                result = (score > 0) - (score < 0)
+                distance = result_distance(score, move_count)
+                self.assertEqual(result_score(result, distance, move_count), score)
+
+    def test_solve_immediate_win(self):
+        """Tests that a win with the next move gets the highest score.
+        """
+        for move, player in ((3, 1), (4, 2), (3, 1), (4, 2), (3, 1), (5, 2)):
+            self.board.make_move(move, player)
+
+        score, move = self.solver.solve(self.board, 1)
+
+        self.assertEqual(move, 3)
+        self.assertEqual(score, (43 - 6) // 2)
+        self.assertEqual(result_distance(score, 6), 1)
+
+    def test_solve_endgame(self):
+        """Tests solving a position where the player to move wins with their third move,
+        and that the opponent's position after the best move is solved as the loss.
+        """
+        self.board.board = [
+            [0, 0, 1, 0, 1, 1, 0],
+            [0, 2, 2, 0, 1, 2, 0],
+            [0, 2, 2, 0, 1, 2, 1],
+            [0, 1, 1, 0, 2, 1, 2],
+            [1, 2, 2, 0, 1, 1, 2],
+            [2, 2, 1, 2, 2, 1, 1]]
+
+        score, move = self.solver.solve(self.board, 1)
+
+        self.assertEqual(score, 4)
+        self.assertEqual(move, 0)
+        self.assertEqual(result_distance(score, 30), 5)
+        self.assertEqual(self.solver.solve(self.board, 1, weak=True), (1, 0))
+
+        self.board.make_move(move, 1)
+        opponent_score, _ = Solver().solve(self.board, 2)
+
+        self.assertEqual(opponent_score, -score)
+
+    def test_solve_stops_when_time_is_up(self):
+        """Tests that the solver stops by raising SearchTimeout when the time is up.
+        """
+        with self.assertRaises(SearchTimeout):
+            self.solver.solve(self.board, 1, time_up=lambda: True)
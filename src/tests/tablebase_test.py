@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from services.ai import AI
+from services.board import Board
+from services.solver import Solver
+from services.tablebase import Tablebase, generate_tablebase, load_tablebase, position_key
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "tablebase.bin")
+        root = Board()
+        root.board = cls.endgame_grid()
+        cls.count = generate_tablebase([root], cls.path, empties=12)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    @staticmethod
+    def endgame_grid():
+        # Player 1 to move wins with their third move, starting in column 0
+        return [
+            [0, 0, 1, 0, 1, 1, 0],
+            [0, 2, 2, 0, 1, 2, 0],
+            [0, 2, 2, 0, 1, 2, 1],
+            [0, 1, 1, 0, 2, 1, 2],
+            [1, 2, 2, 0, 1, 1, 2],
+            [2, 2, 1, 2, 2, 1, 1]]
+
+    def setUp(self):
+        self.board = Board()
+        self.board.board = self.endgame_grid()
+        self.tablebase = Tablebase(self.path)
+
+    def tearDown(self):
+        self.tablebase.close()
+
+    def player_pieces(self, player):
+        return self.board.position if player == 1 else self.board.mask ^ self.board.position
+
+    def test_position_key_mirrored(self):
+        """Tests that a position and its mirror image have the same key, and that the key
+        tells apart the players' pieces.
+        """
+        board = Board()
+        for move, player in ((1, 1), (5, 2), (1, 1)):
+            board.make_move(move, player)
+        mirror_board = Board()
+        for move, player in ((5, 1), (1, 2), (5, 1)):
+            mirror_board.make_move(move, player)
+
+        key = position_key(board.mask ^ board.position, board.mask)
+        self.assertEqual(position_key(mirror_board.mask ^ mirror_board.position,
+                                      mirror_board.mask), key)
+        self.assertEqual(position_key(board.position, board.mask) == key, False)
+
+    def test_probe_solved_positions(self):
+        """Tests the results and distances of the root position, of the position after its
+        winning move, that positions not reached from the root are not found,
+        and the count of lookups and hits.
+        """
+        self.assertEqual(len(self.tablebase), self.count)
+        self.assertEqual(self.tablebase.empties, 12)
+        self.assertEqual(self.tablebase.probe(self.player_pieces(1), self.board.mask), (1, 5))
+
+        self.board.make_move(0, 1)
+        self.assertEqual(self.tablebase.probe(self.player_pieces(2), self.board.mask), (-1, 4))
+
+        self.assertEqual(self.tablebase.probe(0, 0), None)
+        self.assertEqual((self.tablebase.probes, self.tablebase.hits), (3, 2))
+
+    def test_solver_uses_tablebase(self):
+        """Tests that the solver finds the score of the root position from the tablebase.
+        """
+        solver = Solver(tablebase=self.tablebase)
+
+        self.assertEqual(solver.solve(self.board, 1), (4, 0))
+        self.assertEqual(solver.nodes <= 7, True)
+
+    def test_ai_uses_tablebase(self):
+        """Tests that the heuristic search finds a quickest winning move with a search
+        too shallow to reach the end of the game, since the positions after each move
+        are in the tablebase.
+        """
+        ai = AI(self.board, max_depth=1, solver_threshold=None, tablebase=self.tablebase)
+        move = ai.next_move(1, 30)
+        self.board.make_move(move, 1)
+
+        self.assertEqual(self.tablebase.probe(self.player_pieces(2), self.board.mask), (-1, 4))
+
+    def test_load_tablebase(self):
+        """Tests that a missing tablebase file gives no tablebase.
+        """
+        self.assertEqual(load_tablebase(os.path.join(self.directory.name, "missing.bin")), None)
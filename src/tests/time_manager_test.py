@@ -0,0 +1,74 @@
+import unittest
+import time
+
+from services.time_manager import MAX_CLOCK_SHARE, TimeManager
+
+
+class TestTimeManager(unittest.TestCase):
+    def test_move_time_target(self):
+        """Tests that without a game clock the deadline is the time target of a move.
+        """
+        manager = TimeManager(move_time=2)
+
+        manager.start_move(0)
+
+        self.assertAlmostEqual(manager.deadline - manager.start_time, 2)
+        self.assertEqual(manager.time_up(), False)
+        self.assertEqual(manager.can_start_depth(), True)
+
+    def test_game_clock_split_between_moves(self):
+        """Tests that on a game clock the time is split between the AI's remaining moves,
+        with the increment added, and that the target per move still limits it.
+        """
+        manager = TimeManager(move_time=None, game_time=21, increment=0.5)
+
+        manager.start_move(0)
+        self.assertAlmostEqual(manager.deadline - manager.start_time, 21 / 21 + 0.5)
+
+        manager = TimeManager(move_time=1, game_time=21, increment=0.5)
+        manager.start_move(0)
+        self.assertAlmostEqual(manager.deadline - manager.start_time, 1)
+
+        manager = TimeManager(move_time=None, game_time=2, increment=10)
+        manager.start_move(40)
+        self.assertAlmostEqual(manager.deadline - manager.start_time, 2 * MAX_CLOCK_SHARE)
+
+    def test_end_move_updates_clock(self):
+        """Tests that ending a move takes the time used from the game clock and adds
+        the increment, and that a new game resets the clock.
+        """
+        manager = TimeManager(move_time=None, game_time=10, increment=1)
+
+        manager.start_move(0)
+        time.sleep(0.01)
+        elapsed = manager.end_move()
+
+        self.assertEqual(elapsed >= 0.01, True)
+        self.assertAlmostEqual(manager.remaining, 11 - elapsed)
+        self.assertEqual(manager.deadline, None)
+
+        manager.new_game()
+
+        self.assertEqual(manager.remaining, 10)
+
+    def test_deadline_passes(self):
+        """Tests that no new depth is started after half of the time, that half
+        of the time is up then, and that the time is up after the deadline.
+        """
+        manager = TimeManager(move_time=20)
+
+        # The move is set to have started 11 seconds ago, instead of waiting,
+        # so that the test does not depend on how fast the process is scheduled
+        manager.start_move(0)
+        manager.start_time -= 11
+        manager.deadline -= 11
+
+        self.assertEqual(manager.can_start_depth(), False)
+        self.assertEqual(manager.time_up(), False)
+        self.assertEqual(manager.time_up(0.5), True)
+
+        manager.start_time -= 10
+        manager.deadline -= 10
+
+        self.assertEqual(manager.time_up(), True)
+        self.assertEqual(TimeManager().time_up(), False)
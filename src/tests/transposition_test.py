@@ -0,0 +1,153 @@
+import unittest
+
+from services.transposition import (EXACT, LOWER_BOUND, UPPER_BOUND, SLOT_BYTES,
+                                    SharedTranspositionTable, TableEntry, TranspositionTable)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(0.01)
+
+    def test_size_in_megabytes(self):
+        """Tests that the number of slots follows the configured size.
+        """
+        table = TranspositionTable(1)
+
+        self.assertEqual(table.stats()["slots"] * SLOT_BYTES, 2**20)
+
+    def test_store_and_get(self):
+        """Tests that a stored entry is returned by get, including negative values.
+        """
+        self.table.store(123456789, 5, UPPER_BOUND, -1000004, 6)
+
+        entry = self.table.get(123456789)
+
+        self.assertEqual(entry, TableEntry(5, UPPER_BOUND, -1000004, 6))
+
+    def test_get_missing_key(self):
+        """Tests that looking up a position that was never stored returns None,
+        also for the key 0 that empty slots hold.
+        """
+        self.assertEqual(self.table.get(0), None)
+        self.assertEqual(self.table.get(42), None)
+        self.assertEqual(0 in self.table, False)
+
+    def test_store_same_key_replaces(self):
+        """Tests that storing a position again replaces its entry.
+        """
+        self.table.store(7, 6, EXACT, 10, 3)
+        self.table.store(7, 2, LOWER_BOUND, 20, 4)
+
+        self.assertEqual(self.table.get(7), TableEntry(2, LOWER_BOUND, 20, 4))
+        self.assertEqual(len(self.table), 1)
+
+    def test_depth_preferred_replacement(self):
+        """Tests that a shallower entry in the same bucket does not push out
+        a deeper one, and that a deeper entry pushes the old one to the
+        always-replace slot.
+        """
+        buckets = self.table.buckets
+        deep, shallow, deeper = 5, 5 + buckets, 5 + 2 * buckets
+
+        self.table.store(deep, 6, EXACT, 1, 3)
+        self.table.store(shallow, 2, EXACT, 2, 3)
+        self.assertEqual(self.table.get(deep).value, 1)
+        self.assertEqual(self.table.get(shallow).value, 2)
+
+        self.table.store(deeper, 8, EXACT, 3, 3)
+        self.assertEqual(self.table.get(deeper).value, 3)
+        self.assertEqual(self.table.get(deep).value, 1)
+        self.assertEqual(self.table.get(shallow), None)
+
+    def test_stats(self):
+        """Tests that hits, misses, collisions and overwrites are counted.
+        """
+        buckets = self.table.buckets
+        self.table.store(1, 4, EXACT, 0, 3)
+        self.table.store(1 + buckets, 2, EXACT, 0, 3)
+        self.table.store(1 + 2 * buckets, 1, EXACT, 0, 3)
+
+        self.table.get(1)
+        self.table.get(1 + 3 * buckets)
+        self.table.get(2)
+
+        stats = self.table.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["collisions"], 1)
+        self.assertEqual(stats["overwrites"], 1)
+
+    def test_clear(self):
+        """Tests that clear empties the table.
+        """
+        self.table.store(99, 3, EXACT, 5, 1)
+
+        self.table.clear()
+
+        self.assertEqual(self.table.get(99), None)
+        self.assertEqual(len(self.table), 0)
+        self.assertEqual(list(self.table), [])
+
+    def test_stale_entry_replaced_first(self):
+        """Tests that an entry from an older search is replaced by a new one
+        in the depth-preferred slot, even if the new one is searched less deep.
+        """
+        buckets = self.table.buckets
+        old, new = 3, 3 + buckets
+
+        self.table.store(old, 8, EXACT, 1, 3)
+        self.table.new_search()
+        self.table.store(new, 2, EXACT, 2, 3)
+        self.table.store(new + buckets, 1, EXACT, 3, 3)
+
+        self.assertEqual(self.table.get(new).value, 2)
+        self.assertEqual(self.table.get(old), None)
+
+    def test_stale_entry_still_found(self):
+        """Tests that entries from older searches can still be looked up.
+        """
+        self.table.store(11, 4, LOWER_BOUND, 7, 2)
+        self.table.new_search()
+
+        self.assertEqual(self.table.get(11), TableEntry(4, LOWER_BOUND, 7, 2))
+
+    def test_mixed_slot_not_found(self):
+        """Tests that a slot whose data was written without its key, as when two processes
+        write the same slot at once, does not match the key.
+        """
+        self.table.store(7, 6, EXACT, 10, 3)
+        index = 7 % self.table.buckets * 2
+        self.table._data[index] ^= 1
+
+        self.assertEqual(self.table.get(7), None)
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.table = SharedTranspositionTable(0.01)
+        self.other = SharedTranspositionTable(0.01, name=self.table.name)
+
+    def tearDown(self):
+        self.other.close()
+        self.table.close()
+
+    def test_entries_shared(self):
+        """Tests that an entry stored through one table is found through another one
+        using the same shared memory.
+        """
+        self.table.store(123456789, 5, UPPER_BOUND, -1000004, 6)
+
+        self.assertEqual(self.other.get(123456789), TableEntry(5, UPPER_BOUND, -1000004, 6))
+
+    def test_only_owner_clears(self):
+        """Tests that only the table owning the shared memory empties it.
+        """
+        self.table.store(7, 6, EXACT, 10, 3)
+        self.other.clear()
+
+        self.assertEqual(7 in self.table, True)
+
+        self.table.clear()
+
+        self.assertEqual(7 in self.other, False)
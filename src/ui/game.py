@@ -48,6 +48,7 @@ class Game:
         move_count = 0
 
         self.board.clear_board()
+        self._ai.new_game()
         self._select_start_player()
 
         if self._human_player == 1:
@@ -8,6 +8,15 @@ def start(ctx):
 def performance_test(ctx):
     ctx.run("python3 src/ai_perf_test.py", pty = True)
 
+@task
+def generate_book(ctx, plies=8, depth=8):
+    ctx.run(f"python3 src/generate_book.py --plies {plies} --depth {depth}", pty = True)
+
+@task
+def generate_tablebase(ctx, empties=12, openings=2, depth=6):
+    ctx.run(f"python3 src/generate_tablebase.py --empties {empties} --openings {openings} "
+            f"--depth {depth}", pty = True)
+
 @task
 def test(ctx):
     ctx.run("pytest src", pty = True)